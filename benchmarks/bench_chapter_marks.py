@@ -0,0 +1,92 @@
+"""
+Check the chapter marks written by generate_metadata against the old pydub
+timing, and compare the cost of the two.
+
+Writes synthetic partN.flac chapters of random lengths through the
+Journal, then builds the FFMETADATA chapter marks from the journal's sample
+counts and again from the FLAC headers alone (parts without a journal
+entry). Both must give the same START and END, to the millisecond, as
+summing len(AudioSegment.from_file(part)) the way the marks were built
+before. Reports the time each way takes.
+
+    python benchmarks/bench_chapter_marks.py --chapters 50 --seconds 600
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+import numpy as np
+from pydub import AudioSegment
+
+from epub2tts_chatterbox.epub2tts_chatterbox import Journal, generate_metadata
+
+SR = 24000
+
+MARK_RE = re.compile(r"^(START|END)=(\d+)$", re.M)
+
+def write_parts(journal, chapters, seconds, rng):
+    files = []
+    for i in range(1, chapters + 1):
+        # Any sample count, so chapters end between milliseconds and on half milliseconds
+        samples = rng.randint(SR // 2, int(SR * seconds))
+        if rng.random() < 0.2:
+            samples -= samples % (SR // 1000) - SR // 2000
+        audio = (rng.random() * 1000 * np.sin(np.arange(samples) / 20)).astype(np.int16)
+        files.append(f"part{i}.flac")
+        journal.write_chapter(files[-1], audio, SR)
+    return files
+
+def marks(files, journal):
+    start = time.perf_counter()
+    generate_metadata(files, "Author", "Title", [f"Chapter {i}" for i in range(1, len(files) + 1)], journal)
+    elapsed = time.perf_counter() - start
+    with open("FFMETADATAFILE", encoding="utf-8") as file:
+        found = MARK_RE.findall(file.read())
+    os.remove("FFMETADATAFILE")
+    return [int(value) for _, value in found], elapsed
+
+def pydub_marks(files):
+    # What generate_metadata wrote when every part was decoded with pydub
+    start = time.perf_counter()
+    found = []
+    start_time = 0
+    for name in files:
+        duration = len(AudioSegment.from_file(name))
+        found += [start_time, start_time + duration]
+        start_time += duration
+    return found, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Check chapter marks against the old pydub timing")
+    parser.add_argument("--chapters", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=300, help="Longest chapter in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            journal = Journal()
+            files = write_parts(journal, args.chapters, args.seconds, rng)
+            expected, pydub_time = pydub_marks(files)
+            from_journal, journal_time = marks(files, journal)
+            from_headers, header_time = marks(files, Journal("missing.jsonl"))
+        finally:
+            os.chdir(cwd)
+    for name, found in (("journal", from_journal), ("headers", from_headers)):
+        if found != expected:
+            first = next(k for k, (a, b) in enumerate(zip(found, expected)) if a != b)
+            raise SystemExit(f"Marks from the {name} differ from pydub at chapter {first // 2 + 1}: "
+                             f"{found[first]} != {expected[first]}")
+    print(f"\n{args.chapters} chapters, marks identical to pydub to the millisecond")
+    print(f"pydub decode: {pydub_time:.2f}s")
+    print(f"journal:      {journal_time:.4f}s")
+    print(f"headers:      {header_time:.4f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compare reading an EPUB directly with exporting it to .txt and reading that.
+
+Generates synthetic EPUBs and opens each one both ways: export followed by
+Book, and EpubBook. Checks that both give the same chapter titles and the
+same sentences in every paragraph, and reports the time until the first
+chapter is split and until every chapter is.
+
+    python benchmarks/bench_direct.py --books 3 --chapters 200
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+
+from bench_extract import make_epub
+from ebooklib import epub
+
+from epub2tts_chatterbox.epub2tts_chatterbox import Book, EpubBook, ensure_punkt, export
+
+def sentences(book, i):
+    chapter = book.chapter(i)
+    return [chapter.sentences(pindex) for pindex in range(len(chapter))]
+
+def timed_read(open_book):
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        book = open_book()
+    chapters = [sentences(book, 1)]
+    first = time.perf_counter() - start
+    chapters += [sentences(book, i) for i in range(2, len(book) + 1)]
+    return first, time.perf_counter() - start, book, chapters
+
+def exported(path, jobs):
+    export(epub.read_epub(path), path, jobs=jobs)
+    return Book(path.replace(".epub", ".txt"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reading an EPUB directly against exporting it first")
+    parser.add_argument("--books", type=int, default=3)
+    parser.add_argument("--chapters", type=int, default=100)
+    parser.add_argument("--jobs", type=int, default=None, help="Extraction processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    ensure_punkt()
+    totals = {"export": [0.0, 0.0], "direct": [0.0, 0.0]}
+    with tempfile.TemporaryDirectory() as tmp:
+        for seed in range(args.books):
+            path = os.path.join(tmp, f"book{seed}.epub")
+            make_epub(path, args.chapters, seed)
+            copy = os.path.join(tmp, f"direct{seed}.epub")
+            shutil.copy(path, copy)
+            runs = {
+                "export": timed_read(lambda: exported(path, args.jobs)),
+                "direct": timed_read(lambda: EpubBook(copy, jobs=args.jobs)),
+            }
+            for name, (first, total, _, _) in runs.items():
+                totals[name][0] += first
+                totals[name][1] += total
+            txt, direct = runs["export"][2:], runs["direct"][2:]
+            if txt[0].chapter_titles != direct[0].chapter_titles or txt[1] != direct[1]:
+                raise SystemExit(f"book{seed}.epub: the direct read differs from the exported .txt")
+    print(f"\n{args.books} books x {args.chapters} chapters, chapters identical")
+    for name, (first, total) in totals.items():
+        print(f"{name}: first chapter {first:.2f}s, all chapters {total:.2f}s")
+    print(f"direct is {totals['export'][0] / totals['direct'][0]:.1f}x faster to the first chapter")
+
+if __name__ == "__main__":
+    main()
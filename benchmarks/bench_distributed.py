@@ -0,0 +1,99 @@
+"""
+Run a --distribute read locally with several stub TTS workers sharing a
+temporary queue directory, and check it against a single-process read.
+
+One extra worker can be killed part way through a chapter (--kill-after),
+so its lease has to expire and the chapter has to be read again by another
+worker. The chapters of both reads are compared by the checksums in their
+journals, and the wall time of each is reported.
+
+    python benchmarks/bench_distributed.py --workers 4 --size small --latency 0.02 --kill-after 2
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import tempfile
+import time
+from functools import partial
+
+from bench_pipeline import SIZES, write_book
+from stub_tts import StubTTS
+
+import epub2tts_chatterbox.epub2tts_chatterbox as e2t
+from epub2tts_chatterbox.epub2tts_chatterbox import Book, Journal, ensure_punkt, read_book, run_worker
+
+# Short leases so a killed worker's chapter is picked up again within seconds
+LEASE_SECONDS = 3
+HEARTBEAT_SECONDS = 0.5
+POLL_SECONDS = 0.2
+
+def read(workdir, options, queue_dir=None):
+    os.chdir(workdir)
+    model_loader = partial(StubTTS, options["latency"])
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        read_book(Book("book.txt"), "none", False, 0.7, 0.4, model_loader=model_loader, queue_dir=queue_dir)
+    elapsed = time.perf_counter() - start
+    checksums = {part: entry["sha256"] for part, entry in Journal().entries.items()}
+    return elapsed, checksums
+
+def worker(queue_dir, options, idle_exit):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run_worker(queue_dir, partial(StubTTS, options["latency"]), idle_exit=idle_exit, poll=POLL_SECONDS,
+                   heartbeat=HEARTBEAT_SECONDS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a distributed read against a local one")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--size", default="small", choices=SIZES)
+    parser.add_argument("--latency", type=float, default=0.01, help="Stub seconds per generate() call")
+    parser.add_argument("--kill-after", type=float, help="Start one more worker and kill it after this many seconds")
+    args = parser.parse_args()
+
+    ensure_punkt()
+    e2t.LEASE_SECONDS = LEASE_SECONDS
+    e2t.QUEUE_POLL_SECONDS = POLL_SECONDS
+    options = {"latency": args.latency}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        chapters, paragraphs = SIZES[args.size]
+        for name in ("local", "distributed", "queue"):
+            os.makedirs(os.path.join(tmp, name))
+        for name in ("local", "distributed"):
+            write_book(os.path.join(tmp, name, "book.txt"), chapters, paragraphs)
+        local_time, local = read(os.path.join(tmp, "local"), options)
+
+        queue_dir = os.path.join(tmp, "queue")
+        workers = [context.Process(target=worker, args=(queue_dir, options, LEASE_SECONDS * 2))
+                   for _ in range(args.workers)]
+        doomed = None
+        if args.kill_after is not None:
+            doomed = context.Process(target=worker, args=(queue_dir, options, 0))
+            workers.append(doomed)
+        for process in workers:
+            process.start()
+        if doomed is not None:
+            killer = context.Process(target=kill_later, args=(doomed.pid, args.kill_after))
+            killer.start()
+        distributed_time, distributed = read(os.path.join(tmp, "distributed"), options, queue_dir)
+        os.chdir(tmp)
+        if doomed is not None:
+            killer.join()
+        for process in workers:
+            process.join()
+
+        if local != distributed:
+            raise SystemExit("Distributed chapters differ from the local read")
+        print(f"\n{chapters} chapters, {args.workers} workers"
+              f"{', one killed after %.1fs' % args.kill_after if doomed is not None else ''}, output identical")
+        print(f"local:       {local_time:.2f}s")
+        print(f"distributed: {distributed_time:.2f}s ({local_time / distributed_time:.1f}x faster)")
+
+def kill_later(pid, seconds):
+    time.sleep(seconds)
+    with contextlib.suppress(ProcessLookupError):
+        os.kill(pid, 9)
+
+if __name__ == "__main__":
+    main()
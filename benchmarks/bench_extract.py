@@ -0,0 +1,105 @@
+"""
+Compare EPUB to .txt export with the BeautifulSoup and lxml engines.
+
+Generates a corpus of synthetic EPUBs, exports each one with both engines,
+checks that the .txt files are identical and reports the time taken.
+
+    python benchmarks/bench_extract.py --books 5 --chapters 200
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from ebooklib import epub
+
+from epub2tts_chatterbox.epub2tts_chatterbox import export
+
+WORDS = ("the quick brown fox jumps over a lazy dog while “curly” quotes, ‘single’ quotes, "
+         "dashes -- and em—dashes &amp; entities&nbsp;like&hellip; appear").split()
+
+def paragraph(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(5, 80))]
+    if rng.random() < 0.2:
+        words.insert(rng.randint(0, len(words)), f'<a href="#fn{rng.randint(1, 99)}">{rng.randint(1, 99)}</a>')
+    if rng.random() < 0.1:
+        words.insert(rng.randint(0, len(words)), f"<sup>{rng.randint(1, 9)}</sup>")
+    if rng.random() < 0.1:
+        words.insert(rng.randint(0, len(words)), "<span class='x'>nested <em>text</em></span><!-- comment -->")
+    if rng.random() < 0.05:
+        words.insert(rng.randint(0, len(words)), '<a id="page"/>')
+    return "<p>" + " ".join(words) + "</p>"
+
+def chapter_html(rng, number):
+    heading = rng.choice(["h1", "h2", "h3", "div class='chapter-title'", None])
+    body = []
+    if heading:
+        body.append(f"<{heading}>Chapter {number}</{heading.split()[0]}>")
+    body.extend(paragraph(rng) for _ in range(rng.randint(5, 60)))
+    newline = "\r\n" if rng.random() < 0.2 else "\n"
+    return newline.join([
+        '<?xml version="1.0" encoding="utf-8"?>',
+        "<!DOCTYPE html>",
+        '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>t</title></head><body>',
+        *body,
+        "</body></html>",
+    ]).encode("utf-8")
+
+def make_epub(path, chapters, seed):
+    rng = random.Random(seed)
+    book = epub.EpubBook()
+    book.set_identifier(f"bench-{seed}")
+    book.set_title(f"Benchmark {seed}")
+    book.add_author("Bench")
+    items = []
+    for number in range(1, chapters + 1):
+        item = epub.EpubHtml(title=f"Chapter {number}", file_name=f"chap_{number}.xhtml")
+        item.set_content(chapter_html(rng, number))
+        book.add_item(item)
+        items.append(item)
+    book.toc = [epub.Link(item.file_name, item.title, item.id) for item in items]
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ["nav"] + items
+    epub.write_epub(path, book)
+
+def timed_export(path, workdir, engine, jobs):
+    source = os.path.join(workdir, os.path.basename(path))
+    shutil.copy(path, source)
+    book = epub.read_epub(source)
+    start = time.perf_counter()
+    export(book, source, engine=engine, jobs=jobs)
+    elapsed = time.perf_counter() - start
+    with open(source.replace(".epub", ".txt"), encoding="utf-8") as f:
+        return elapsed, f.read()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EPUB extraction engines")
+    parser.add_argument("--books", type=int, default=3)
+    parser.add_argument("--chapters", type=int, default=100)
+    parser.add_argument("--jobs", type=int, default=None, help="Processes for the lxml engine (default: one per CPU)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "corpus")
+        os.makedirs(corpus)
+        for engine in ("bs4", "lxml"):
+            os.makedirs(os.path.join(tmp, engine))
+        totals = {"bs4": 0.0, "lxml": 0.0}
+        for seed in range(args.books):
+            path = os.path.join(corpus, f"book{seed}.epub")
+            make_epub(path, args.chapters, seed)
+            bs4_time, bs4_text = timed_export(path, os.path.join(tmp, "bs4"), "bs4", 1)
+            lxml_time, lxml_text = timed_export(path, os.path.join(tmp, "lxml"), "lxml", args.jobs)
+            totals["bs4"] += bs4_time
+            totals["lxml"] += lxml_time
+            if bs4_text != lxml_text:
+                raise SystemExit(f"book{seed}.epub: lxml output differs from bs4")
+        print(f"\n{args.books} books x {args.chapters} chapters, output identical")
+        print(f"bs4:  {totals['bs4']:.2f}s")
+        print(f"lxml: {totals['lxml']:.2f}s ({totals['bs4'] / totals['lxml']:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
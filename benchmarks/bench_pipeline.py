@@ -0,0 +1,145 @@
+"""
+End-to-end benchmark of the audiobook pipeline with a stub TTS model.
+
+Every book size runs in a fresh process. The process writes a synthetic
+book, then opens it as a Book, runs read_book (with StubTTS in place of ChatterboxTTS),
+generate_metadata and the final m4b mux. The results are printed as JSON:
+per-stage wall time, peak RSS and the real-time factor. The stub's latency
+is configurable, so the non-model overhead can be watched for regressions
+on its own (--latency 0) or next to a realistic model speed.
+
+    python benchmarks/bench_pipeline.py --sizes small,medium --latency 0.05
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from stub_tts import StubTTS
+
+from epub2tts_chatterbox.epub2tts_chatterbox import (
+    Book,
+    M4bEncoder,
+    ensure_punkt,
+    generate_metadata,
+    read_book,
+)
+
+# chapters, paragraphs per chapter
+SIZES = {
+    "small": (5, 20),
+    "medium": (20, 50),
+    "large": (60, 100),
+}
+
+WORDS = ("the quick brown fox jumps over a lazy dog and then runs far away into "
+         "an old dark forest where nobody has ever been before").split()
+
+def write_book(path, chapters, paragraphs, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Title: Benchmark\nAuthor: Stub\n\n")
+        for chapter in range(1, chapters + 1):
+            f.write(f"# Chapter {chapter}\n\n")
+            for _ in range(paragraphs):
+                sentences = []
+                for _ in range(rng.randint(2, 6)):
+                    words = [rng.choice(WORDS) for _ in range(rng.randint(4, 25))]
+                    sentences.append(" ".join(words).capitalize() + ".")
+                f.write(" ".join(sentences) + "\n\n")
+
+def peak_rss():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def run_case(size, options):
+    with tempfile.TemporaryDirectory(prefix=f"bench-{size}-") as workdir:
+        os.chdir(workdir)
+        try:
+            return run_book(size, options)
+        finally:
+            os.chdir(tempfile.gettempdir())
+
+def run_book(size, options):
+    chapters, paragraphs = SIZES[size]
+    write_book("book.txt", chapters, paragraphs)
+    model_loader = partial(StubTTS, options["latency"], options["latency_per_char"], options["chars_per_second"])
+    timings = {}
+    stats = {}
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        book = Book("book.txt")
+        timings["open_book"] = time.perf_counter() - start
+
+        encoder = M4bEncoder("book.txt", "none", options["encode_jobs"])
+        files = read_book(book, "none", False, 0.7, 0.4, encoder, None,
+                          options["workers"], model_loader, options["max_tokens"], stats)
+        timings["read_book"] = stats["read"]
+        timings["model_load"] = stats["model_load"]
+        for stage in ("text_busy", "synthesis_busy", "writer_busy"):
+            timings[stage] = stats[stage]
+
+        mark = time.perf_counter()
+        generate_metadata(files, book.author, book.title, book.chapter_titles, durations=encoder.durations())
+        timings["generate_metadata"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        encoder.finish(files)
+        timings["mux"] = time.perf_counter() - mark
+    total = time.perf_counter() - start
+    return {
+        "size": size,
+        "chapters": chapters,
+        "paragraphs": chapters * paragraphs,
+        "model_inputs": stats["inputs"],
+        "audio_seconds": round(stats["audio_seconds"], 3),
+        "wall_seconds": round(total, 3),
+        "real_time_factor": round(total / stats["audio_seconds"], 5),
+        "peak_rss_bytes": peak_rss(),
+        "stages": {stage: None if value is None else round(value, 3) for stage, value in timings.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audiobook pipeline with a stub TTS model")
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma separated book sizes from {', '.join(SIZES)}")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub seconds per generate() call")
+    parser.add_argument("--latency-per-char", type=float, default=0.0, help="Stub seconds per character of text")
+    parser.add_argument("--chars-per-second", type=float, default=15.0, help="Stub speaking rate")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--max-tokens", type=int, default=0)
+    parser.add_argument("--encode-jobs", type=int, default=2, help="Chapter encodes at once, 0 for one streamed encode")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    ensure_punkt()
+    options = {
+        "latency": args.latency,
+        "latency_per_char": args.latency_per_char,
+        "chars_per_second": args.chars_per_second,
+        "workers": args.workers,
+        "max_tokens": args.max_tokens,
+        "encode_jobs": args.encode_jobs,
+    }
+    results = []
+    for size in args.sizes.split(","):
+        # A fresh process per size so peak RSS is not carried over
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results.append(executor.submit(run_case, size, options).result())
+    report = json.dumps({"options": options, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
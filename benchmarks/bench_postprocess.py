@@ -0,0 +1,102 @@
+"""
+Compare sentence post-processing in NumPy with the pydub equivalent.
+
+Generates chapters of synthetic sentences with uneven leading and trailing
+silence and uneven levels, then trims, joins and loudness-normalizes every
+chapter twice: with assemble_chapter on in-memory buffers, and with pydub
+going through a wav file per sentence as the original per-sentence files
+did. Reports the time taken and how far apart the two chapter lengths are.
+
+    python benchmarks/bench_postprocess.py --chapters 5 --sentences 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+from pydub import AudioSegment
+from pydub.silence import detect_leading_silence
+
+from epub2tts_chatterbox.epub2tts_chatterbox import (
+    TRIM_THRESHOLD_DB,
+    assemble_chapter,
+    to_int16,
+)
+
+SR = 24000
+
+def sentence(rng):
+    # A tone burst between random lengths of low noise, at a random level
+    seconds = rng.uniform(1.0, 6.0)
+    t = np.arange(int(SR * seconds), dtype=np.float32) / SR
+    speech = rng.uniform(0.05, 0.6) * np.sin(2 * np.pi * rng.uniform(110, 440) * t)
+    lead = np.full(int(SR * rng.uniform(0.05, 0.6)), 0.001, dtype=np.float32)
+    tail = np.full(int(SR * rng.uniform(0.05, 0.8)), 0.001, dtype=np.float32)
+    return np.concatenate([lead, speech.astype(np.float32), tail])
+
+def make_chapter(rng, sentences):
+    paragraphs = []
+    while sentences > 0:
+        count = min(sentences, rng.randint(1, 6))
+        paragraphs.append([sentence(rng) for _ in range(count)])
+        sentences -= count
+    return paragraphs
+
+def numpy_chapter(paragraphs, sentencepause, loudness):
+    return assemble_chapter(paragraphs, SR, trim=True, sentencepause=sentencepause, loudness=loudness)
+
+def pydub_trim(segment):
+    start = detect_leading_silence(segment, silence_threshold=TRIM_THRESHOLD_DB)
+    end = detect_leading_silence(segment.reverse(), silence_threshold=TRIM_THRESHOLD_DB)
+    return segment[start:len(segment) - end]
+
+def pydub_chapter(paragraphs, sentencepause, loudness, workdir):
+    combined = AudioSegment.empty()
+    for sentence_wavs in paragraphs:
+        for k, wav in enumerate(sentence_wavs):
+            path = os.path.join(workdir, f"sntnc{k}.wav")
+            sf.write(path, to_int16(wav), SR)
+            if k:
+                combined += AudioSegment.silent(sentencepause, frame_rate=SR)
+            combined += pydub_trim(AudioSegment.from_file(path))
+            os.remove(path)
+        combined += AudioSegment.silent(600, frame_rate=SR)
+    combined += AudioSegment.silent(2000, frame_rate=SR)
+    combined = combined.apply_gain(loudness - combined.dBFS)
+    path = os.path.join(workdir, "chapter.flac")
+    combined.export(path, format="flac")
+    audio, _ = sf.read(path, dtype="int16")
+    os.remove(path)
+    return audio
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NumPy against pydub sentence post-processing")
+    parser.add_argument("--chapters", type=int, default=3)
+    parser.add_argument("--sentences", type=int, default=100, help="Sentences per chapter")
+    parser.add_argument("--sentence-pause", type=int, default=200)
+    parser.add_argument("--loudness", type=float, default=-20.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    chapters = [make_chapter(rng, args.sentences) for _ in range(args.chapters)]
+    totals = {"pydub": 0.0, "numpy": 0.0}
+    length_difference = 0.0
+    with tempfile.TemporaryDirectory() as workdir:
+        for paragraphs in chapters:
+            start = time.perf_counter()
+            slow = pydub_chapter(paragraphs, args.sentence_pause, args.loudness, workdir)
+            totals["pydub"] += time.perf_counter() - start
+            start = time.perf_counter()
+            fast = numpy_chapter(paragraphs, args.sentence_pause, args.loudness)
+            totals["numpy"] += time.perf_counter() - start
+            length_difference = max(length_difference, abs(len(fast) - len(slow)) / SR)
+    print(f"\n{args.chapters} chapters x {args.sentences} sentences, "
+          f"chapter lengths within {length_difference:.2f}s of each other")
+    print(f"pydub: {totals['pydub']:.2f}s")
+    print(f"numpy: {totals['numpy']:.2f}s ({totals['pydub'] / totals['numpy']:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure CLI startup time and memory of the paths that never synthesize.
+
+Each case runs in a fresh interpreter, which reports the time the case took
+in-process, its peak RSS and which heavy modules got imported. The script
+fails if a heavy module is imported or a limit is exceeded, so it can guard
+against a top-level import creeping back in.
+
+    python benchmarks/bench_startup.py --repeat 5 --max-seconds 2 --max-rss-mb 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_extract import make_epub
+
+# Modules that belong to synthesis only
+HEAVY = ("torch", "torchaudio", "chatterbox", "nltk", "soundfile", "bs4", "PIL", "pydub")
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+{body}
+seconds = time.perf_counter() - start
+with open(sys.argv[1], "w") as f:
+    json.dump({{
+        "seconds": seconds,
+        "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "heavy": [name for name in {heavy!r} if name in sys.modules],
+    }}, f)
+"""
+
+CASES = {
+    "import": "import epub2tts_chatterbox",
+    "help": """
+from epub2tts_chatterbox import main
+try:
+    main(["export", "--help"])
+except SystemExit:
+    pass
+""",
+    "export": """
+from epub2tts_chatterbox.epub2tts_chatterbox import main
+main(["export", "book.epub", "--jobs", "1"])
+""",
+}
+
+def run_case(name, workdir):
+    result_path = os.path.join(workdir, "result.json")
+    textfile = os.path.join(workdir, "book.txt")
+    if os.path.isfile(textfile):
+        os.remove(textfile)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", CHILD.format(body=CASES[name], heavy=HEAVY), result_path],
+                   cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL)
+    wall = time.perf_counter() - start
+    with open(result_path) as f:
+        result = json.load(f)
+    result["wall"] = wall
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup time and memory of the non-synthesis paths")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Comma separated cases (default: {','.join(CASES)})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chapters", type=int, default=20, help="Chapters in the book used by the export case")
+    parser.add_argument("--max-seconds", type=float, help="Fail if a case's median wall time is above this")
+    parser.add_argument("--max-rss-mb", type=float, help="Fail if a case's peak RSS is above this")
+    args = parser.parse_args()
+
+    failures = []
+    report = []
+    with tempfile.TemporaryDirectory() as workdir:
+        make_epub(os.path.join(workdir, "book.epub"), args.chapters, 0)
+        for name in args.cases.split(","):
+            results = [run_case(name, workdir) for _ in range(args.repeat)]
+            wall = statistics.median(result["wall"] for result in results)
+            seconds = statistics.median(result["seconds"] for result in results)
+            rss_mb = max(result["rss_kb"] for result in results) / 1024
+            heavy = sorted({module for result in results for module in result["heavy"]})
+            report.append({"case": name, "wall_seconds": round(wall, 3), "in_process_seconds": round(seconds, 3),
+                           "peak_rss_mb": round(rss_mb, 1), "heavy_modules": heavy})
+            if heavy:
+                failures.append(f"{name} imported {', '.join(heavy)}")
+            if args.max_seconds is not None and wall > args.max_seconds:
+                failures.append(f"{name} took {wall:.2f}s, limit {args.max_seconds}s")
+            if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+                failures.append(f"{name} used {rss_mb:.0f} MB, limit {args.max_rss_mb} MB")
+    print(json.dumps(report, indent=2))
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+if __name__ == "__main__":
+    main()
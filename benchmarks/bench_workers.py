@@ -0,0 +1,74 @@
+"""
+Run a --workers read with the stub TTS model and check it against a
+single-process read.
+
+Both reads write their chapters through the Journal, and the chapters are
+compared by the checksums it records, so the scheduler has to hand out
+every chapter once and the parent has to put them back in book order. The
+wall time of each read is reported. With --broken the workers' model fails
+to load, and the read has to fail instead of waiting forever.
+
+    python benchmarks/bench_workers.py --workers 4 --size medium --latency 0.01
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from bench_pipeline import SIZES, write_book
+from stub_tts import StubTTS
+
+from epub2tts_chatterbox.epub2tts_chatterbox import Book, Journal, ensure_punkt, read_book
+
+def broken_model():
+    raise RuntimeError("stub model failed to load")
+
+def read(workdir, model_loader, workers):
+    os.chdir(workdir)
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        read_book(Book("book.txt"), "none", False, 0.7, 0.4, workers=workers, model_loader=model_loader)
+    elapsed = time.perf_counter() - start
+    checksums = {part: entry["sha256"] for part, entry in Journal().entries.items()}
+    return elapsed, checksums
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a --workers read against a single-process one")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--size", default="small", choices=SIZES)
+    parser.add_argument("--latency", type=float, default=0.01, help="Stub seconds per generate() call")
+    parser.add_argument("--broken", action="store_true", help="Check that a model that fails to load fails the read")
+    args = parser.parse_args()
+
+    ensure_punkt()
+    model_loader = partial(StubTTS, args.latency)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        chapters, paragraphs = SIZES[args.size]
+        for name in ("single", "workers"):
+            os.makedirs(os.path.join(tmp, name))
+            write_book(os.path.join(tmp, name, "book.txt"), chapters, paragraphs)
+        try:
+            if args.broken:
+                try:
+                    read(os.path.join(tmp, "workers"), broken_model, args.workers)
+                except BrokenProcessPool:
+                    print(f"\n{args.workers} workers whose model fails to load: the read failed as it should")
+                    return
+                raise SystemExit("The read did not fail with a broken model")
+            single_time, single = read(os.path.join(tmp, "single"), model_loader, 1)
+            workers_time, workers = read(os.path.join(tmp, "workers"), model_loader, args.workers)
+        finally:
+            os.chdir(cwd)
+
+    if len(workers) != chapters or single != workers:
+        raise SystemExit("Chapters read by the workers differ from the single-process read")
+    print(f"\n{chapters} chapters, {args.workers} workers, output identical")
+    print(f"single:  {single_time:.2f}s")
+    print(f"workers: {workers_time:.2f}s ({single_time / workers_time:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Deterministic stand-in for ChatterboxTTS, for benchmarks that should not
+depend on model weights or model speed.
+
+Each generate() call sleeps for a configurable latency and returns a tone
+whose length follows the text length, so audio durations, chapter marks and
+real-time factors behave like a real book.
+"""
+import time
+import zlib
+
+import numpy as np
+
+
+class StubTokenizer:
+    def encode(self, text):
+        # Roughly the granularity of the Chatterbox English tokenizer
+        return list(text)
+
+
+class StubTTS:
+    sr = 24000
+    device = "cpu"
+
+    def __init__(self, latency=0.0, latency_per_char=0.0, chars_per_second=15.0):
+        self.latency = latency
+        self.latency_per_char = latency_per_char
+        self.chars_per_second = chars_per_second
+        self.tokenizer = StubTokenizer()
+        self.conds = None
+
+    def prepare_conditionals(self, wav_fpath, exaggeration=0.5):
+        self.conds = (wav_fpath, exaggeration)
+
+    def generate(self, text, **kwargs):
+        delay = self.latency + self.latency_per_char * len(text)
+        if delay:
+            time.sleep(delay)
+        samples = max(1, round(self.sr * len(text) / self.chars_per_second))
+        frequency = 110 + zlib.crc32(text.encode("utf-8")) % 330
+        t = np.arange(samples, dtype=np.float32) / self.sr
+        return (0.3 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)[None, :]
@@ -5,29 +5,37 @@ import sys
 if sys.platform == 'darwin':
     os.environ['PYTORCH_ENABLE_MPS_FALLBACK'] = '1'
 import argparse
+from array import array
+import collections
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextlib
+import copy
+from functools import partial
+import hashlib
+from html.entities import name2codepoint
+import importlib.metadata
+import io
+import json
+import math
+import multiprocessing
+import queue
 import numpy as np
 import re
-import soundfile
+import socket
 import subprocess
-import torch
+import threading
+import time
 import warnings
-from tqdm import tqdm
-import torchaudio as ta
-from chatterbox.tts import ChatterboxTTS
 
-from bs4 import BeautifulSoup
 import ebooklib
 from ebooklib import epub
-import soundfile as sf
 from lxml import etree
-from mutagen import mp4
-import nltk
-from nltk.tokenize import sent_tokenize
-from PIL import Image
-from pydub import AudioSegment
 import zipfile
 import warnings
 
+# torch, chatterbox, nltk, soundfile, bs4 and PIL are imported where they are
+# used, so exporting an epub or muxing finished chapters never loads the model stack
+
 warnings.filterwarnings("ignore")
 
 namespaces = {
@@ -41,7 +49,20 @@ namespaces = {
 
 warnings.filterwarnings("ignore", module="ebooklib.epub")
 
+# Append-only log of every chapter written, with its state, checksum and length
+JOURNAL = "journal.jsonl"
+
+# Size of the bounded queues between the read_book pipeline stages
+PIPELINE_DEPTH = 32
+
+# Persistent cache for voice conditioning, shared between runs and books
+CACHE_DIR = os.environ.get(
+    "EPUB2TTS_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "epub2tts-chatterbox"),
+)
+
 def ensure_punkt():
+    import nltk
     try:
         nltk.data.find("tokenizers/punkt")
     except LookupError:
@@ -86,6 +107,7 @@ def chap2text_epub(chap, item_id=None, toc=None):
         "script",
     ]
     paragraphs = []
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(chap, "html.parser")
 
     # Step 1: Try to find chapter title in heading tags (<h1>, <h2>, <h3>)
@@ -144,6 +166,169 @@ def chap2text_epub(chap, item_id=None, toc=None):
 
     return chapter_title_text, paragraphs
 
+# Strings BeautifulSoup leaves out of .text and .strings, skipped by the lxml engine too
+SKIPPED_TEXT_TAGS = {"rt", "rp", "script", "style", "template"}
+XML_ENTITIES = {b"amp", b"lt", b"gt", b"quot", b"apos"}
+ENTITY_RE = re.compile(rb"&([A-Za-z][A-Za-z0-9]*);")
+START_TAG_RE = re.compile(rb"<[A-Za-z]")
+WHITESPACE_RE = re.compile(r"\s+")
+QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+XHTML_PARSER = etree.XMLParser(resolve_entities=False, load_dtd=False, no_network=True, huge_tree=True)
+
+def local_name(element):
+    return element.tag.rpartition("}")[2].lower()
+
+def element_text(element):
+    parts = [element.text or ""]
+    for child in element:
+        if isinstance(child.tag, str) and local_name(child) not in SKIPPED_TEXT_TAGS:
+            parts.append(element_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+def remove_element(element):
+    # Like BeautifulSoup's extract(): the text following the element stays
+    parent = element.getparent()
+    if parent is None:
+        return
+    if element.tail:
+        previous = element.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or "") + element.tail
+        else:
+            parent.text = (parent.text or "") + element.tail
+    parent.remove(element)
+
+def parse_xhtml(chap):
+    """
+    Parse an XHTML spine document with lxml, or return None when the document
+    is not plain well-formed UTF-8 XHTML and has to go through BeautifulSoup.
+    """
+    if chap.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return None
+    def numeric_entity(match):
+        if match.group(1) in XML_ENTITIES:
+            return match.group(0)
+        codepoint = name2codepoint.get(match.group(1).decode("ascii"))
+        if codepoint is None:
+            raise KeyError(match.group(1))
+        return b"&#%d;" % codepoint
+    try:
+        # HTML named entities are unknown to XML, and the XML parser would turn
+        # \r\n into \n where html.parser keeps it. Character references are
+        # only allowed inside the root element.
+        chap = ENTITY_RE.sub(numeric_entity, chap)
+        root_start = START_TAG_RE.search(chap)
+        if root_start is None:
+            return None
+        prolog = chap[:root_start.start()].replace(b"\r", b"")
+        chap = prolog + chap[root_start.start():].rstrip().replace(b"\r", b"&#13;")
+        return etree.fromstring(chap, XHTML_PARSER)
+    except (KeyError, etree.XMLSyntaxError):
+        return None
+
+def chap2text_epub_lxml(chap, item_id=None, toc_titles=None):
+    """
+    Faster chap2text_epub for well-formed XHTML, returning the same result.
+
+    Args:
+        chap: The chapter content (XHTML bytes).
+        item_id: The ID of the item in the EPUB spine (for fallback naming).
+        toc_titles: Dict of TOC href (without fragment) to title, see toc_index.
+
+    Returns:
+        tuple: (chapter_title_text, paragraphs)
+    """
+    root = parse_xhtml(chap)
+    if root is None:
+        toc = [epub.Link(href, title) for href, title in (toc_titles or {}).items()]
+        return chap2text_epub(chap, item_id=item_id, toc=toc)
+
+    # Collect everything the title lookup and footnote removal need in one pass
+    heading_tags = ['h1', 'h2', 'h3']
+    common_classes = ['chapter', 'chapter-title', 'title', 'heading']
+    first_tag = {}
+    first_class = {}
+    links = []
+    sups = []
+    for element in root.iter(etree.Element):
+        name = local_name(element)
+        if name in heading_tags:
+            first_tag.setdefault(name, element)
+        elif name == "a" and element.get("href") is not None:
+            links.append(element)
+        elif name == "sup":
+            sups.append(element)
+        classes = element.get("class")
+        if classes:
+            for class_name in classes.split():
+                first_class.setdefault(class_name, element)
+
+    chapter_title_text = None
+    for tag in heading_tags:
+        heading = first_tag.get(tag)
+        if heading is not None and element_text(heading).strip():
+            chapter_title_text = element_text(heading).strip()
+            print(f"Found title in <{tag}>: '{chapter_title_text}'")
+            break
+
+    if not chapter_title_text:
+        for class_name in common_classes:
+            element = first_class.get(class_name)
+            if element is not None and element_text(element).strip():
+                chapter_title_text = element_text(element).strip()
+                print(f"Found title in class '{class_name}': '{chapter_title_text}'")
+                break
+
+    if not chapter_title_text and toc_titles and item_id:
+        if item_id in toc_titles:
+            chapter_title_text = toc_titles[item_id]
+            print(f"Found title in TOC for item '{item_id}': '{chapter_title_text}'")
+
+    if not chapter_title_text:
+        chapter_title_text = item_id.replace('.xhtml', '').replace('_', ' ').title() if item_id else None
+        print(f"No title found, using fallback: '{chapter_title_text}'")
+
+    # Remove footnotes (links with only numbers)
+    for a in links:
+        if not any(char.isalpha() for char in element_text(a)):
+            remove_element(a)
+
+    # Remove superscript numbers (e.g., footnote markers)
+    for sup in sups:
+        if element_text(sup).isdigit():
+            remove_element(sup)
+
+    chapter_paragraphs = [element for element in root.iter(etree.Element) if local_name(element) == "p"]
+    if not chapter_paragraphs:
+        print(f"No <p> tags found in '{chapter_title_text or item_id}'. Trying <div>.")
+        chapter_paragraphs = [element for element in root.iter(etree.Element) if local_name(element) == "div"]
+
+    paragraphs = []
+    for p in chapter_paragraphs:
+        paragraph_text = element_text(p).strip()
+        if paragraph_text:
+            paragraphs.append(paragraph_text)
+
+    return chapter_title_text, paragraphs
+
+def toc_index(toc):
+    # href (without fragment) -> title, first entry wins like the linear TOC scan
+    toc_titles = {}
+    for toc_item in toc:
+        if hasattr(toc_item, "href"):
+            toc_titles.setdefault(toc_item.href.split('#')[0], toc_item.title)
+    return toc_titles
+
+def extract_chapter(task):
+    content, item_id, toc_titles = task
+    return chap2text_epub_lxml(content, item_id=item_id, toc_titles=toc_titles)
+
+def clean_paragraph(paragraph):
+    clean = WHITESPACE_RE.sub(' ', paragraph)
+    clean = clean.translate(QUOTES)  # Curly quotes to standard quotes
+    return clean.replace('--', ', ').replace('—', ', ')
+
 def get_epub_cover(epub_path):
     try:
         with zipfile.ZipFile(epub_path) as z:
@@ -172,30 +357,46 @@ def get_epub_cover(epub_path):
     except FileNotFoundError:
         print(f"Could not get cover image of {epub_path}")
 
-def export(book, sourcefile):
+def epub_chapters(book, engine="lxml", jobs=None):
+    """(title, paragraphs) of every document in the spine of an ebooklib book, in reading order."""
+    # Get the table of contents
+    toc = book.get_toc() if hasattr(book, 'get_toc') else []
+
+    spine_ids = [spine_tuple[0] for spine_tuple in book.spine if spine_tuple[1] == 'yes']
+    items = {item.get_id(): item for item in book.get_items() if item.get_type() == ebooklib.ITEM_DOCUMENT}
+
+    if engine == "bs4":
+        # Pass item_id and toc to chap2text_epub
+        return [chap2text_epub(items[id].get_content(), item_id=id, toc=toc) for id in spine_ids if id in items]
+    toc_titles = toc_index(toc)
+    tasks = [(items[id].get_content(), id, toc_titles) for id in spine_ids if id in items]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(min(jobs, len(tasks))) as executor:
+            return list(executor.map(extract_chapter, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+    return [extract_chapter(task) for task in tasks]
+
+def export(book, sourcefile, engine="lxml", jobs=None):
+    """
+    Export an EPUB to the editable .txt format read by Book.
+
+    The default lxml engine parses the spine documents in a pool of `jobs`
+    processes (default: one per CPU); engine="bs4" uses the original
+    BeautifulSoup extraction one document at a time.
+    """
     book_contents = []
     cover_image = get_epub_cover(sourcefile)
     image_path = None
 
     if cover_image is not None:
+        from PIL import Image
         image = Image.open(cover_image)
         image_filename = sourcefile.replace(".epub", ".png")
         image_path = os.path.join(image_filename)
         image.save(image_path)
         print(f"Cover image saved to {image_path}")
 
-    # Get the table of contents
-    toc = book.get_toc() if hasattr(book, 'get_toc') else []
-
-    spine_ids = [spine_tuple[0] for spine_tuple in book.spine if spine_tuple[1] == 'yes']
-    items = {item.get_id(): item for item in book.get_items() if item.get_type() == ebooklib.ITEM_DOCUMENT}
-
-    for id in spine_ids:
-        item = items.get(id)
-        if item is None:
-            continue
-        # Pass item_id and toc to chap2text_epub
-        chapter_title, chapter_paragraphs = chap2text_epub(item.get_content(), item_id=id, toc=toc)
+    for chapter_title, chapter_paragraphs in epub_chapters(book, engine, jobs):
         book_contents.append({"title": chapter_title, "paragraphs": chapter_paragraphs})
 
     outfile = sourcefile.replace(".epub", ".txt")
@@ -213,72 +414,252 @@ def export(book, sourcefile):
             if not chapter["paragraphs"] or chapter["paragraphs"] == ['']:
                 continue
             else:
-                # Use chapter title if available, otherwise fallback to "Part {i}"
-                title = chapter["title"] if chapter["title"] else f"Part {i}"
+                # Use chapter title if available, otherwise fallback to "Part {i}".
+                # A heading over several lines has to stay on the one # line
+                title = WHITESPACE_RE.sub(' ', chapter["title"]) if chapter["title"] else f"Part {i}"
                 file.write(f"# {title}\n\n")
                 for paragraph in chapter["paragraphs"]:
-                    clean = re.sub(r'[\s\n]+', ' ', paragraph)
-                    clean = re.sub(r'[“”]', '"', clean)  # Curly double quotes to standard double quotes
-                    clean = re.sub(r'[‘’]', "'", clean)  # Curly single quotes to standard single quotes
-                    clean = re.sub(r'--', ', ', clean)
-                    clean = re.sub(r'—', ', ', clean)
-                    file.write(f"{clean}\n\n")
+                    file.write(f"{clean_paragraph(paragraph)}\n\n")
 
     return book_contents
 
-def get_book(sourcefile):
-    book_contents = []
-    book_title = sourcefile
-    book_author = "Unknown"
-    chapter_titles = []
-
-    with open(sourcefile, "r", encoding="utf-8") as file:
-        current_chapter = {"title": "blank", "paragraphs": []}
-        initialized_first_chapter = False
-        lines_skipped = 0
-        for line in file:
+# Line endings recognised by Book, the same as reading the file in text mode
+LINE_END_RE = re.compile(rb"\r\n|\r|\n")
+
+# Chapters a Book keeps split in memory, enough for the text stage to run ahead of the reader
+LOADED_CHAPTERS = 4
+
+def text_lines(file):
+    """Yield (start, end, line) for every line of a binary file, with byte offsets."""
+    offset = 0
+    for raw in file:
+        if b"\r" not in raw:
+            yield offset, offset + len(raw), raw.decode("utf-8")
+            offset += len(raw)
+            continue
+        start = 0
+        for match in LINE_END_RE.finditer(raw):
+            yield offset + start, offset + match.end(), raw[start:match.end()].decode("utf-8")
+            start = match.end()
+        if start < len(raw):
+            yield offset + start, offset + len(raw), raw[start:].decode("utf-8")
+        offset += len(raw)
+
+class Chapter:
+    """
+    One chapter split into the cleaned sentences that are read. All the
+    sentences are kept in one string with their end offsets, and
+    `paragraph_ends` holds the index of the sentence that ends each paragraph.
+    """
+
+    __slots__ = ("title", "text", "ends", "paragraph_ends", "sizes")
+
+    def __init__(self, title, text, ends, paragraph_ends, sizes):
+        self.title = title
+        self.text = text
+        self.ends = ends
+        self.paragraph_ends = paragraph_ends
+        # Bytes of each paragraph in the source file, the unit of progress
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.paragraph_ends)
+
+    def sentences(self, pindex):
+        first = self.paragraph_ends[pindex - 1] if pindex else 0
+        starts = [self.ends[k - 1] if k else 0 for k in range(first, self.paragraph_ends[pindex])]
+        return [self.text[start:end] for start, end in zip(starts, self.ends[first:self.paragraph_ends[pindex]])]
+
+def chapter_paragraphs(task):
+    """The paragraphs of the chapter described by `task`, and their sizes in bytes."""
+    sourcefile, title, ranges, read_title = task
+    if sourcefile.endswith(".epub"):
+        # An EpubBook task carries the paragraphs rather than where they are in the file
+        return list(ranges), array("q", (len(paragraph.encode("utf-8")) for paragraph in ranges))
+    with open(sourcefile, "rb") as file:
+        file.seek(ranges[0])
+        data = file.read(ranges[-1] - ranges[0])
+    paragraphs = [data[ranges[k] - ranges[0]:ranges[k + 1] - ranges[0]].decode("utf-8").strip()
+                  for k in range(0, len(ranges), 2)]
+    return paragraphs, array("q", (ranges[k + 1] - ranges[k] for k in range(0, len(ranges), 2)))
+
+def chapter_key(task, settings):
+    """Hash of what a chapter's audio is made of: its title, its text and the `settings` it is read with."""
+    sourcefile, title, ranges, read_title = task
+    paragraphs, _ = chapter_paragraphs(task)
+    key = json.dumps([title, read_title, paragraphs, settings], sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
 
-            if lines_skipped < 2 and (line.startswith("Title") or line.startswith("Author")):
-                lines_skipped += 1
-                if line.startswith('Title: '):
-                    book_title = line.replace('Title: ', '').strip()
-                elif line.startswith('Author: '):
-                    book_author = line.replace('Author: ', '').strip()
+def load_chapter(task):
+    """
+    Read and split the chapter described by `task`, a tuple from
+    Book.chapter_task. Each paragraph is run through sent_tokenize once.
+    """
+    from nltk.tokenize import sent_tokenize
+    sourcefile, title, ranges, read_title = task
+    sentences = []
+    ends = array("q")
+    paragraph_ends = array("q")
+    length = 0
+    paragraphs, sizes = chapter_paragraphs(task)
+    for k, paragraph in enumerate(paragraphs):
+        if k == 0 and read_title:
+            paragraph = title + ". " + paragraph
+        for sent in sent_tokenize(paragraph):
+            if any(char.isalnum() for char in sent):
+                sent = conditional_sentence_case(sent.strip())
+                sentences.append(sent)
+                length += len(sent)
+                ends.append(length)
+        paragraph_ends.append(len(ends))
+    return Chapter(title, "".join(sentences), ends, paragraph_ends, sizes)
+
+class Book:
+    """
+    Lazy view of a .txt book in the format written by export.
+
+    Opening it is a single pass over the bytes of the file that finds the
+    title, author, chapter titles and the offsets of every paragraph, without
+    tokenizing anything. Chapters are read and split into sentences when they
+    are asked for, and only the last few are kept, so memory stays flat for
+    any size of book and reading starts as soon as the first chapter is split.
+    """
+
+    def __init__(self, sourcefile):
+        self.sourcefile = sourcefile
+        self.title = sourcefile
+        self.author = "Unknown"
+        # Every chapter heading, used for the chapter metadata
+        self.chapter_titles = []
+        self.titles = []
+        # Byte (start, end) of every paragraph line and where each chapter's paragraphs end
+        self.paragraphs = array("q")
+        self.chapter_ends = array("q")
+        # Read each chapter's title as its first sentence
+        self.read_titles = True
+        # Cover image bytes found in the source, a .txt has none
+        self.cover = None
+        self.loaded = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        with open(sourcefile, "rb") as file:
+            title = "blank"
+            initialized_first_chapter = False
+            lines_skipped = 0
+            for start, end, line in text_lines(file):
+
+                if lines_skipped < 2 and (line.startswith("Title") or line.startswith("Author")):
+                    lines_skipped += 1
+                    if line.startswith('Title: '):
+                        self.title = line.replace('Title: ', '').strip()
+                    elif line.startswith('Author: '):
+                        self.author = line.replace('Author: ', '').strip()
+                    continue
+
+                line = line.strip()
+                if line.startswith("#"):
+                    if self.open_paragraphs() or not initialized_first_chapter:
+                        if initialized_first_chapter:
+                            self.close_chapter(title)
+                        initialized_first_chapter = True
+                    chapter_title = line[1:].strip()
+                    title = chapter_title if any(c.isalnum() for c in chapter_title) else "blank"
+                    self.chapter_titles.append(title)
+                elif line:
+                    if not initialized_first_chapter:
+                        self.chapter_titles.append("blank")
+                        initialized_first_chapter = True
+                    if any(char.isalnum() for char in line):
+                        self.paragraphs.extend((start, end))
+
+            # Append the last chapter if it contains any paragraphs.
+            if self.open_paragraphs():
+                self.close_chapter(title)
+
+    def open_paragraphs(self):
+        # Paragraphs seen since the last chapter was closed
+        return len(self.paragraphs) // 2 - (self.chapter_ends[-1] if self.chapter_ends else 0)
+
+    def close_chapter(self, title):
+        self.titles.append(title)
+        self.chapter_ends.append(len(self.paragraphs) // 2)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def chapter_range(self, i):
+        # Byte (start, end) pairs of the paragraphs of chapter i, counting from 1
+        first = self.chapter_ends[i - 2] if i > 1 else 0
+        return self.paragraphs[2 * first:2 * self.chapter_ends[i - 1]]
+
+    def chapter_size(self, i):
+        ranges = self.chapter_range(i)
+        return sum(ranges[k + 1] - ranges[k] for k in range(0, len(ranges), 2))
+
+    def chapter_task(self, i):
+        """Everything load_chapter needs for chapter i, small enough to send to a worker process."""
+        title = self.titles[i - 1]
+        return self.sourcefile, title, self.chapter_range(i), self.read_titles and title != "Title"
+
+    def chapter(self, i):
+        with self.lock:
+            if i in self.loaded:
+                self.loaded.move_to_end(i)
+                return self.loaded[i]
+        chapter = load_chapter(self.chapter_task(i))
+        with self.lock:
+            self.loaded[i] = chapter
+            while len(self.loaded) > LOADED_CHAPTERS:
+                self.loaded.popitem(last=False)
+        return chapter
+
+class EpubBook(Book):
+    """
+    A Book read straight from an EPUB, without exporting it to .txt first.
+
+    The spine is extracted in memory as export does and laid out as the
+    exported .txt would be, a title chapter first and empty documents left
+    out, so the chapters and their audio are the same either way. Sentences
+    are still split a chapter at a time as they are asked for, and the
+    cover is kept as bytes for the m4b rather than saved next to the epub.
+    """
+
+    def __init__(self, sourcefile, engine="lxml", jobs=None):
+        self.sourcefile = sourcefile
+        self.read_titles = True
+        self.loaded = collections.OrderedDict()
+        self.lock = threading.Lock()
+        book = epub.read_epub(sourcefile)
+        self.author = book.get_metadata("DC", "creator")[0][0]
+        self.title = book.get_metadata("DC", "title")[0][0]
+        cover = get_epub_cover(sourcefile)
+        self.cover = cover.read() if cover is not None else None
+        self.titles = ["Title"]
+        # The paragraphs of every chapter, cleaned like the lines of an exported .txt
+        self.chapters = [(f"{self.title}, by {self.author}",)]
+        for k, (title, paragraphs) in enumerate(epub_chapters(book, engine, jobs), start=1):
+            paragraphs = tuple(clean_paragraph(paragraph).strip() for paragraph in paragraphs)
+            paragraphs = tuple(paragraph for paragraph in paragraphs if any(c.isalnum() for c in paragraph))
+            if not paragraphs:
                 continue
+            # Collapsed to one line as export writes it, a newline would also break FFMETADATAFILE
+            title = WHITESPACE_RE.sub(' ', title).strip() if title else f"Part {k}"
+            self.titles.append(title if any(c.isalnum() for c in title) else "blank")
+            self.chapters.append(paragraphs)
+        self.chapter_titles = self.titles
 
-            line = line.strip()
-            if line.startswith("#"):
-                if current_chapter["paragraphs"] or not initialized_first_chapter:
-                    if initialized_first_chapter:
-                        book_contents.append(current_chapter)
-                    current_chapter = {"title": None, "paragraphs": []}
-                    initialized_first_chapter = True
-                chapter_title = line[1:].strip()
-                if any(c.isalnum() for c in chapter_title):
-                    current_chapter["title"] = chapter_title
-                    chapter_titles.append(current_chapter["title"])
-                else:
-                    current_chapter["title"] = "blank"
-                    chapter_titles.append("blank")
-            elif line:
-                if not initialized_first_chapter:
-                    chapter_titles.append("blank")
-                    initialized_first_chapter = True
-                if any(char.isalnum() for char in line):
-                    sentences = sent_tokenize(line)
-                    cleaned_sentences = [s for s in sentences if any(char.isalnum() for char in s)]
-                    line = ' '.join(cleaned_sentences)
-                    current_chapter["paragraphs"].append(line)
-
-        # Append the last chapter if it contains any paragraphs.
-        if current_chapter["paragraphs"]:
-            book_contents.append(current_chapter)
-
-    return book_contents, book_title, book_author, chapter_titles
-
-def sort_key(s):
-    # extract number from the string
-    return int(re.findall(r'\d+', s)[0])
+    def chapter_size(self, i):
+        return sum(len(paragraph.encode("utf-8")) for paragraph in self.chapters[i - 1])
+
+    def chapter_task(self, i):
+        title = self.titles[i - 1]
+        return self.sourcefile, title, self.chapters[i - 1], self.read_titles and title != "Title"
+
+def open_book(sourcefile):
+    """A Book for a .txt, or an EpubBook reading an .epub directly."""
+    if sourcefile.endswith(".epub"):
+        return EpubBook(sourcefile)
+    return Book(sourcefile)
 
 def check_for_file(filename):
     if os.path.isfile(filename):
@@ -290,46 +671,628 @@ def check_for_file(filename):
         else:
             os.remove(filename)
 
-def append_silence(tempfile, duration=1200):
-    # if temppfile does not exist, return
-    if not os.path.isfile(tempfile):
-        print(f"File {tempfile} does not exist, skipping silence append.")
+def to_pcm(wav):
+    # Model output is a (1, samples) float tensor, keep it as a flat float32 buffer
+    if hasattr(wav, "detach"):
+        wav = wav.detach().cpu().numpy()
+    return np.asarray(wav, dtype=np.float32).reshape(-1)
+
+def silence(sr, duration):
+    # `duration` in ms, same unit as the paragraph and chapter pauses
+    return np.zeros(int(sr * duration / 1000), dtype=np.float32)
+
+# Sentence edges quieter than this are trimmed by --trim-silence
+TRIM_THRESHOLD_DB = -45
+# Speech frames quieter than this are left out of the --normalize loudness
+LOUDNESS_GATE_DB = -50
+# Normalized chapters are scaled down further if needed to keep peaks under this
+PEAK_LIMIT_DB = -1
+
+def db_to_amplitude(db):
+    return 10 ** (db / 20)
+
+def frame_rms(audio, frame):
+    # RMS of every whole frame of `frame` samples
+    frames = len(audio) // frame
+    return np.sqrt(np.mean(np.square(audio[:frames * frame].reshape(frames, frame)), axis=1))
+
+def trim_silence(wav, sr, threshold_db=TRIM_THRESHOLD_DB, frame_ms=10, keep_ms=20):
+    """
+    Cut the leading and trailing silence of a sentence buffer, keeping
+    `keep_ms` around the first and last 10 ms frame louder than `threshold_db`.
+    """
+    frame = max(1, sr * frame_ms // 1000)
+    loud = np.flatnonzero(frame_rms(wav, frame) > db_to_amplitude(threshold_db))
+    if len(loud) == 0:
+        return wav[:0]
+    keep = sr * keep_ms // 1000
+    return wav[max(loud[0] * frame - keep, 0):min((loud[-1] + 1) * frame + keep, len(wav))]
+
+def normalize_loudness(audio, sr, target_db, frame_ms=50):
+    """
+    Scale a chapter so the RMS of its speech is `target_db` dBFS. Pauses are
+    gated out of the measurement, and the gain is limited so the peak stays
+    under PEAK_LIMIT_DB.
+    """
+    rms = frame_rms(audio, max(1, sr * frame_ms // 1000))
+    speech = rms[rms > db_to_amplitude(LOUDNESS_GATE_DB)]
+    if len(speech) == 0:
+        return audio
+    gain = db_to_amplitude(target_db) / np.sqrt(np.mean(np.square(speech)))
+    peak = np.max(np.abs(audio))
+    gain = min(gain, db_to_amplitude(PEAK_LIMIT_DB) / peak)
+    return audio * np.float32(gain)
+
+def assemble_chapter(paragraphs, sr, paragraphpause=600, chapterpause=2000, trim=False, sentencepause=0, loudness=None):
+    """
+    Join the sentence buffers of a chapter into one int16 buffer.
+
+    Args:
+        paragraphs: One list of float32 sentence buffers per paragraph.
+        sr: Sample rate of the buffers.
+        paragraphpause: Silence after every paragraph, in ms.
+        chapterpause: Extra silence at the end of the chapter, in ms.
+        trim: Trim the silence the model leaves around each sentence.
+        sentencepause: Silence between the sentences of a paragraph, in ms.
+        loudness: Normalize the chapter's speech to this RMS level in dBFS.
+    """
+    pieces = []
+    gap = silence(sr, sentencepause)
+    for sentence_wavs in paragraphs:
+        for k, wav in enumerate(sentence_wavs):
+            if k and len(gap):
+                pieces.append(gap)
+            pieces.append(trim_silence(wav, sr) if trim else wav)
+        pieces.append(silence(sr, paragraphpause))
+    pieces.append(silence(sr, chapterpause))
+    audio = np.concatenate(pieces)
+    if loudness is not None:
+        audio = normalize_loudness(audio, sr, loudness)
+    return to_int16(audio)
+
+def to_int16(audio):
+    return np.round(np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+def model_version():
+    try:
+        return importlib.metadata.version("chatterbox-tts")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def temp_name(path):
+    # Unique temporary name, several processes or nodes may write the same file at once
+    return f"{path}.{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def conds_cache_path(sample, exaggeration):
+    key = f"{file_hash(sample)}:{exaggeration}:{model_version()}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, "conds", f"{digest}.pt")
+
+def load_conditionals(model, sample, exaggeration):
+    """
+    Prepare the voice-cloning conditioning for `sample` once and cache it on disk.
+
+    The cache key is the sample's content hash, the exaggeration and the
+    chatterbox-tts version, so a later book read with the same voice skips
+    loading the reference wav and recomputing the speaker embedding.
+    """
+    cache_path = conds_cache_path(sample, exaggeration)
+    if os.path.isfile(cache_path):
+        try:
+            from chatterbox.tts import Conditionals
+            model.conds = Conditionals.load(cache_path, map_location=model.device).to(model.device)
+            print(f"Using cached voice conditioning {cache_path}")
+            return
+        except Exception as e:
+            print(f"Could not load cached conditioning {cache_path}: {e} -- Recomputing")
+    model.prepare_conditionals(sample, exaggeration=exaggeration)
+    if os.path.isfile(cache_path):
+        # Saved meanwhile by another process starting with the same voice, e.g. a --workers process
         return
-    audio = AudioSegment.from_file(tempfile)
-    # Create a silence segment
-    silence = AudioSegment.silent(duration)
-    # Append the silence segment to the audio
-    combined = audio + silence
-    # Save the combined audio back to file
-    combined.export(tempfile, format="flac")
-
-def chatterbox_read(sentences, sample, filenames, model, exaggeration, cfg_weight):
-    for i, sent in enumerate(sentences):
-        clean_sent = conditional_sentence_case(sent.strip())
-        max_attempts = 3
-        # This "try 3 times" loop is probably not needed, actual failure was from a torch recursive error that was fixed
-        for attempt in range(1, max_attempts + 1):
+    temp_path = temp_name(cache_path)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        model.conds.save(temp_path)
+        os.replace(temp_path, cache_path)
+        print(f"Saved voice conditioning to {cache_path}")
+    except OSError as e:
+        # The cache only saves time, reading goes on without it
+        print(f"Could not save voice conditioning to {cache_path}: {e}")
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+
+class SentenceCache:
+    """
+    Content-addressed cache of synthesized sentences with size-bounded LRU eviction.
+
+    Entries are keyed by the normalized sentence text plus the voice sample hash,
+    exaggeration, cfg_weight, chatterbox-tts version and, for a --cpu-fast
+    model, its model_precision, so re-reading an edited
+    book only synthesizes the sentences that changed and repeated sentences are
+    synthesized once. Audio is stored as int16 .npy files; reading an entry
+    refreshes its mtime, and the least recently used entries are removed once
+    the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, sample, exaggeration, cfg_weight, max_bytes, precision="fp32"):
+        self.directory = os.path.join(CACHE_DIR, "sentences")
+        if sample == "none":
+            # The built-in voice is generated with the model defaults
+            settings = "none"
+        else:
+            settings = f"{file_hash(sample)}:{exaggeration}:{cfg_weight}"
+        self.settings = f"{settings}:{model_version()}"
+        self.set_precision(precision)
+        self.max_bytes = max_bytes
+        self.size = None
+
+    def set_precision(self, precision):
+        # Audio of a quantized or compiled model is kept apart, fp32 keys stay as they were
+        self.key = self.settings if precision == "fp32" else f"{self.settings}:{precision}"
+
+    def path(self, text):
+        normalized = " ".join(text.split())
+        digest = hashlib.sha256(f"{self.key}:{normalized}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.npy")
+
+    def get(self, text):
+        path = self.path(text)
+        try:
+            audio = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return audio.astype(np.float32) / 32767
+
+    def put(self, text, audio):
+        # Never raises, --workers processes reading the same sentence may write it at once
+        path = self.path(text)
+        temp_path = temp_name(path)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                np.save(f, to_int16(audio))
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"Could not cache sentence audio in {path}: {e}")
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            return
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += size
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        entries = []
+        for root, dirs, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    # Removed by another process sharing the cache
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        # Trim to 90% of the limit so eviction does not run on every write
+        entries = sorted(self.entries())
+        self.size = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if self.size <= self.max_bytes * 0.9:
+                break
             try:
-                if sample == "none":
-                    #print(f"Generating audio for sentence: {clean_sent}")
-                    wav = model.generate(clean_sent)
-                else:
-                    #print(f"Generating audio for sentence: {clean_sent}")
-                    # generate(self, text, repetition_penalty=1.2, min_p=0.05, top_p=1.0, audio_prompt_path=None, exaggeration=0.5, cfg_weight=0.5, temperature=0.8)
-                    wav = model.generate(clean_sent, audio_prompt_path=sample, exaggeration=exaggeration, cfg_weight=cfg_weight)
-                
-                #print(f"Saving audio to {filenames[i]}")
-                ta.save(filenames[i], wav, model.sr)
-                # confirm the file was created
-                if not os.path.isfile(filenames[i]):
-                    raise FileNotFoundError(f"File {filenames[i]} was not created.")
-                break  # Success, exit retry loop
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            self.size -= size
+        if removed:
+            print(f"Evicted {removed} least recently used sentences from {self.directory}")
 
-            except Exception as e:
-                if attempt < max_attempts:
-                    print(f"Attempt {attempt} failed for sentence '{clean_sent}': {e} -- Retrying...")
-                else:
-                    print(f"Failed to process sentence '{clean_sent}' after {max_attempts} attempts. Error: {e}")
+def manage_cache(action, max_bytes=None):
+    cache_files = []
+    for root, dirs, names in os.walk(CACHE_DIR):
+        cache_files.extend(os.path.join(root, name) for name in names)
+    if action == "list":
+        totals = {}
+        for path in cache_files:
+            kind = os.path.relpath(path, CACHE_DIR).split(os.sep)[0]
+            count, size = totals.get(kind, (0, 0))
+            totals[kind] = (count + 1, size + os.path.getsize(path))
+        for kind, (count, size) in sorted(totals.items()):
+            print(f"{kind:12} {count:8} files {size / (1024 * 1024):10.1f} MiB")
+        print(f"{len(cache_files)} files, {sum(size for _, size in totals.values()) / (1024 * 1024):.1f} MiB in {CACHE_DIR}")
+    elif action == "prune":
+        cache = SentenceCache("none", None, None, max_bytes)
+        cache.evict()
+        print(f"Sentence cache is {cache.size / (1024 * 1024):.1f} MiB")
+    elif action == "clear":
+        for path in cache_files:
+            os.remove(path)
+        print(f"Removed {len(cache_files)} files from {CACHE_DIR}")
+
+# Sentence timings summed per paragraph and per chapter by Telemetry
+TELEMETRY_TOTALS = ("sentences", "retries", "failed", "rejected", "generate_seconds", "audio_seconds")
+
+def real_time_factor(seconds, audio_seconds):
+    return round(seconds / audio_seconds, 4) if audio_seconds else None
+
+class Telemetry:
+    """
+    Machine-readable progress for read_book, one JSON event per line.
+
+    Events are written to a file or a tcp://host:port socket, or with no
+    target kept in `events`, which is how --workers processes hand theirs
+    back. Sentence timings are summed per paragraph and per chapter as they
+    are written. With `profile_every` every Nth sentence the model generates
+    runs under the torch profiler and its trace is saved to `profile_dir`.
+    """
+
+    def __init__(self, target=None, profile_every=0, profile_dir="profiles"):
+        self.profile_every = profile_every
+        self.profile_dir = profile_dir
+        self.generated = 0
+        self.events = []
+        self.totals = {}
+        self.lock = threading.Lock()
+        self.connection = None
+        self.stream = None
+        if target is None:
+            return
+        if target.startswith("tcp://"):
+            host, _, port = target[len("tcp://"):].rpartition(":")
+            self.connection = socket.create_connection((host, int(port)))
+            self.stream = self.connection.makefile("w", encoding="utf-8")
+        else:
+            self.stream = open(target, "a", encoding="utf-8")
+
+    def emit(self, event, **fields):
+        self.write({"event": event, "time": round(time.time(), 3), "pid": os.getpid(), **fields})
+
+    def write(self, event):
+        with self.lock:
+            kind = event["event"]
+            if kind == "sentence":
+                for key in (event["chapter"], (event["chapter"], event["paragraph"])):
+                    totals = self.totals.setdefault(key, dict.fromkeys(TELEMETRY_TOTALS, 0))
+                    totals["sentences"] += 1
+                    totals["retries"] += max(event["attempts"] - 1, 0)
+                    totals["failed"] += not event["ok"]
+                    totals["rejected"] += event.get("rejected", 0)
+                    totals["generate_seconds"] += event["generate_seconds"]
+                    totals["audio_seconds"] += event["audio_seconds"]
+            elif kind == "paragraph":
+                self.totals.pop((event["chapter"], event["paragraph"]), None)
+            elif kind == "chapter":
+                self.totals.pop(event["chapter"], None)
+            if self.stream is None:
+                self.events.append(event)
+            else:
+                self.stream.write(json.dumps(event) + "\n")
+                self.stream.flush()
+
+    def summary(self, key):
+        """Sentence totals of a chapter index or (chapter, paragraph) pair so far."""
+        with self.lock:
+            totals = dict(self.totals.get(key, dict.fromkeys(TELEMETRY_TOTALS, 0)))
+        totals["generate_seconds"] = round(totals["generate_seconds"], 4)
+        totals["audio_seconds"] = round(totals["audio_seconds"], 4)
+        totals["real_time_factor"] = real_time_factor(totals["generate_seconds"], totals["audio_seconds"])
+        return totals
+
+    def sentence(self, position, index, text, source, attempts, seconds, wav, sr, rejected=0, runaway=False):
+        chapter, paragraph = position
+        audio_seconds = len(wav) / sr if wav is not None else 0.0
+        self.emit(
+            "sentence",
+            chapter=chapter,
+            paragraph=paragraph,
+            sentence=index,
+            chars=len(text),
+            source=source,
+            attempts=attempts,
+            rejected=rejected,
+            runaway=runaway,
+            ok=wav is not None,
+            generate_seconds=round(seconds, 4),
+            audio_seconds=round(audio_seconds, 4),
+            real_time_factor=real_time_factor(seconds, audio_seconds),
+        )
+
+    @contextlib.contextmanager
+    def profile(self, position, index):
+        self.generated += 1
+        if not self.profile_every or self.generated % self.profile_every:
+            yield
+            return
+        chapter, paragraph = position
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"chapter{chapter}-paragraph{paragraph}-sentence{index}-{os.getpid()}.json")
+        import torch
+        with torch.profiler.profile(record_shapes=True) as profiler:
+            yield
+        profiler.export_chrome_trace(path)
+        self.emit("profile", chapter=chapter, paragraph=paragraph, sentence=index, path=path)
+
+    def replay(self, events):
+        for event in events:
+            self.write(event)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+        if self.connection is not None:
+            self.connection.close()
+
+def chatterbox_read(sentences, sample, model, exaggeration, cfg_weight, cache=None, telemetry=None,
+                    position=(0, 0), on_audio=None, guard=None):
+    # `sentences` are already cleaned and packed by model_inputs,
+    # `position` is the (chapter, paragraph) they are reported under,
+    # `on_audio` gets every sentence's audio as soon as it is there
+    audio = []
+    for i, clean_sent in enumerate(sentences):
+        start = time.time()
+        wav = None
+        attempts = 0
+        rejected = 0
+        accepted = True
+        if cache is not None:
+            source = "cache"
+            wav = cache.get(clean_sent)
+        if wav is None:
+            source = "model"
+            wav, attempts, rejected, accepted = generate_sentence(clean_sent, sample, model, exaggeration, cfg_weight,
+                                                                  telemetry, position, i, guard)
+            if wav is not None and accepted and cache is not None:
+                cache.put(clean_sent, wav)
+        if wav is not None:
+            audio.append(wav)
+            if on_audio is not None:
+                on_audio(wav)
+        if telemetry is not None:
+            seconds = time.time() - start
+            telemetry.sentence(position, i, clean_sent, source, attempts, seconds, wav, model.sr, rejected, not accepted)
+    return audio
+
+def generate_sentence(clean_sent, sample, model, exaggeration, cfg_weight, telemetry=None, position=(0, 0), index=0,
+                      guard=None, split=True):
+    """
+    Run the model on one sentence, returning (float32 audio or None, attempts
+    made, outputs the RunawayGuard rejected, whether the audio passed it).
+
+    A rejected output is generated again like a failed one. If every attempt
+    is rejected the sentence is split in two and each half generated on its
+    own, and if that does not pass either the output closest to the
+    expected length is kept.
+    """
+    max_attempts = 3
+    kwargs = {} if sample == "none" else {"exaggeration": exaggeration, "cfg_weight": cfg_weight}
+    rejected = 0
+    best = None
+    # This "try 3 times" loop is probably not needed, actual failure was from a torch recursive error that was fixed
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with telemetry.profile(position, index) if telemetry is not None else contextlib.nullcontext(), \
+                 guard.capped(model, clean_sent) if guard is not None else contextlib.nullcontext():
+                #print(f"Generating audio for sentence: {clean_sent}")
+                # generate(self, text, repetition_penalty=1.2, min_p=0.05, top_p=1.0, audio_prompt_path=None, exaggeration=0.5, cfg_weight=0.5, temperature=0.8)
+                # Conditioning for the sample is prepared once in read_book, see load_conditionals
+                wav = to_pcm(model.generate(clean_sent, **kwargs))
+        except Exception as e:
+            if attempt < max_attempts:
+                print(f"Attempt {attempt} failed for sentence '{clean_sent}': {e} -- Retrying...")
+            else:
+                print(f"Failed to process sentence '{clean_sent}' after {max_attempts} attempts. Error: {e}")
+            continue
+        reason = guard.check(clean_sent, wav, model.sr) if guard is not None else None
+        if reason is None:
+            if guard is not None:
+                guard.accept(clean_sent, wav, model.sr)
+            return wav, attempt, rejected, True
+        rejected += 1
+        guard.report(telemetry, position, index, clean_sent, wav, model.sr, reason, attempt)
+        if best is None or guard.distance(clean_sent, wav, model.sr) < guard.distance(clean_sent, best, model.sr):
+            best = wav
+    if best is None:
+        return None, max_attempts, rejected, False
+    parts = split_for_retry(clean_sent) if split else []
+    if parts:
+        print(f"Every output of '{clean_sent}' was rejected -- Reading it in {len(parts)} parts")
+        wavs = []
+        for part in parts:
+            wav, attempts, part_rejected, accepted = generate_sentence(part, sample, model, exaggeration, cfg_weight,
+                                                                       telemetry, position, index, guard, split=False)
+            rejected += part_rejected
+            if wav is None or not accepted:
+                break
+            wavs.append(wav)
+        else:
+            return np.concatenate(wavs), max_attempts, rejected, True
+    print(f"Keeping the closest of {rejected} rejected outputs of '{clean_sent}'")
+    return best, max_attempts, rejected, False
+
+# Chatterbox speech tokens per second of audio, used to cap generation length
+SPEECH_TOKENS_PER_SECOND = 25
+
+class RunawayGuard:
+    """
+    Reject model outputs that are not a reading of their text: far longer
+    than the text warrants, with a long silence inside, or looping.
+
+    The expected length of a text is its length over the speaking rate,
+    which starts at `chars_per_second` and follows the outputs that pass.
+    While a sentence is generated, the speech tokens ChatterboxTTS's T3
+    stage may produce are capped a little past the longest output `check`
+    lets through, so a runaway stops early instead of running to the 1000
+    tokens generate asks for.
+    """
+
+    def __init__(self, ratio=2.5, chars_per_second=14.0, min_excess=3.0, max_silence=2.0, max_repetition=0.85):
+        self.ratio = ratio
+        self.min_excess = min_excess
+        self.max_silence = max_silence
+        self.max_repetition = max_repetition
+        # The starting rate counts as this many seconds of accepted speech
+        self.chars = chars_per_second * 30
+        self.seconds = 30.0
+
+    def expected(self, text):
+        return len(text) * self.seconds / self.chars
+
+    def distance(self, text, wav, sr):
+        return abs(len(wav) / sr - self.expected(text))
+
+    @contextlib.contextmanager
+    def capped(self, model, text):
+        """Cap model.t3.inference at the speech tokens `text` may take, if the model has it."""
+        t3 = getattr(model, "t3", None)
+        inference = getattr(t3, "inference", None)
+        if inference is None:
+            yield
+            return
+        expected = self.expected(text)
+        cap = int((max(expected * self.ratio, expected + self.min_excess) + 2) * SPEECH_TOKENS_PER_SECOND)
+
+        def capped_inference(*args, **kwargs):
+            kwargs["max_new_tokens"] = min(kwargs.get("max_new_tokens") or cap, cap)
+            return inference(*args, **kwargs)
+
+        own = "inference" in vars(t3)
+        t3.inference = capped_inference
+        try:
+            yield
+        finally:
+            if own:
+                t3.inference = inference
+            else:
+                del t3.inference
+
+    def check(self, text, wav, sr):
+        """The reason `wav` is not a good reading of `text`, or None."""
+        duration = len(wav) / sr
+        expected = self.expected(text)
+        if duration > expected * self.ratio and duration - expected > self.min_excess:
+            return "too_long"
+        frame = max(1, sr // 20)
+        rms = frame_rms(wav, frame)
+        loud = rms > db_to_amplitude(TRIM_THRESHOLD_DB)
+        if loud.any():
+            inside = loud[np.argmax(loud):len(loud) - np.argmax(loud[::-1])]
+            # Longest run of quiet frames between the first and last loud one
+            edges = np.flatnonzero(np.diff(np.concatenate(([1], inside.astype(np.int8), [1]))))
+            runs = edges[1::2] - edges[::2]
+            if len(runs) and runs.max() * frame / sr > self.max_silence:
+                return "silence"
+        if duration > expected * 1.3 and repetition(rms, sr // frame) > self.max_repetition:
+            return "repetition"
+        return None
+
+    def accept(self, text, wav, sr):
+        self.chars += len(text)
+        self.seconds += len(wav) / sr
+
+    def report(self, telemetry, position, index, text, wav, sr, reason, attempt):
+        print(f"Attempt {attempt} for sentence '{text}' rejected: {reason}, {len(wav) / sr:.1f}s "
+              f"for an expected {self.expected(text):.1f}s -- Retrying...")
+        if telemetry is not None:
+            chapter, paragraph = position
+            telemetry.emit("runaway", chapter=chapter, paragraph=paragraph, sentence=index, reason=reason,
+                           attempt=attempt, audio_seconds=round(len(wav) / sr, 3),
+                           expected_seconds=round(self.expected(text), 3))
+
+def repetition(rms, frames_per_second):
+    """
+    Highest autocorrelation of the loudness envelope at lags of one second
+    up to half its length. Speech stays low, a loop of the same words peaks
+    near 1 at the loop length.
+    """
+    envelope = np.log(rms + 1e-4)
+    envelope = envelope - envelope.mean()
+    n = len(envelope)
+    if n < 4 * frames_per_second:
+        return 0.0
+    spectrum = np.fft.rfft(envelope, 2 * n)
+    correlation = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    if correlation[0] <= 0:
+        return 0.0
+    # Normalize each lag by its overlap so long lags are not penalized
+    correlation = correlation / correlation[0] * n / (n - np.arange(n))
+    return float(correlation[frames_per_second:n // 2].max())
+
+def split_for_retry(text):
+    """Two halves of `text` at a clause boundary, or between words, or [] when it is too short."""
+    pieces = CLAUSE_RE.split(text)
+    if len(pieces) < 2:
+        pieces = text.split()
+        if len(pieces) < 6:
+            return []
+    total = sum(len(piece) for piece in pieces)
+    size = 0
+    for k, piece in enumerate(pieces[:-1], start=1):
+        size += len(piece)
+        if size >= total / 2:
+            break
+    return [" ".join(pieces[:k]), " ".join(pieces[k:])]
+
+def token_count(tokenizer, text):
+    return len(tokenizer.encode(text))
+
+# Clause boundaries where an over-long sentence can be split for the model
+CLAUSE_RE = re.compile(r"(?<=[,;:—])\s+")
+
+def model_inputs(sentences, tokenizer=None, max_tokens=0):
+    """
+    The texts sent to the model for one paragraph's cleaned sentences.
+
+    With a `max_tokens` budget, adjacent sentences are packed together up to
+    that many model text tokens and longer sentences are split at clause
+    boundaries, so the model gets fewer calls and no run-on inputs.
+    """
+    if max_tokens > 0 and tokenizer is not None:
+        return pack_sentences(sentences, tokenizer, max_tokens)
+    return sentences
+
+def pack_sentences(sentences, tokenizer, max_tokens):
+    pieces = []
+    for sentence in sentences:
+        if token_count(tokenizer, sentence) <= max_tokens:
+            pieces.append(sentence)
+        else:
+            pieces.extend(split_sentence(sentence, tokenizer, max_tokens))
+    return join_pieces(pieces, tokenizer, max_tokens)
+
+def split_sentence(sentence, tokenizer, max_tokens):
+    # Clauses first, then words for a clause that is still too long
+    pieces = []
+    for clause in CLAUSE_RE.split(sentence):
+        if token_count(tokenizer, clause) <= max_tokens:
+            pieces.append(clause)
+        else:
+            pieces.extend(join_pieces(clause.split(), tokenizer, max_tokens))
+    return join_pieces(pieces, tokenizer, max_tokens)
+
+def join_pieces(pieces, tokenizer, max_tokens):
+    joined = []
+    for piece in pieces:
+        if joined and token_count(tokenizer, joined[-1] + " " + piece) <= max_tokens:
+            joined[-1] += " " + piece
+        else:
+            joined.append(piece)
+    return joined
 
 def fix_sentence_length(sentences):
     fixed_sentences = []
@@ -356,81 +1319,977 @@ def fix_sentence_length(sentences):
             fixed_sentences.append(sentence)
     return fixed_sentences
 
-def read_book(book_contents, sample, notitles, exaggeration, cfg_weight):
+def load_model(device=None, cpu_fast=None, threads=None, interop_threads=None):
+    """
+    Load ChatterboxTTS on the best available device.
+
+    `threads` and `interop_threads` set torch's intra- and inter-op thread
+    pools of this process. With `cpu_fast`, a dict of optimize_for_cpu
+    options, the model is quantized or compiled when it runs on the CPU.
+    """
+    import torch
+    from chatterbox.tts import ChatterboxTTS
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only possible before torch has run any parallel work in this process
+            print(f"Could not set inter-op threads to {interop_threads}: {e}")
     # Automatically detect the best available device
-    if torch.cuda.is_available():
-        device = "cuda"
-    elif torch.backends.mps.is_available():
-        device = "mps"
-    else:
-        device = "cpu"
-    current_device = torch.device(device)
+    if device is None:
+        if torch.cuda.is_available():
+            device = "cuda"
+        elif torch.backends.mps.is_available():
+            device = "mps"
+        else:
+            device = "cpu"
     print(f"Attempting to use device: {device}")
     model = ChatterboxTTS.from_pretrained(device=device)
+    if cpu_fast is not None:
+        if device == "cpu":
+            model = optimize_for_cpu(model, **cpu_fast)
+        else:
+            print(f"--cpu-fast only applies to the CPU, running fp32 on {device}")
+    return model
 
-    segments = []
-    for i, chapter in enumerate(book_contents, start=1):
-        paragraphpause = 600  # default pause between paragraphs in ms
-        files = []
-        partname = f"part{i}.flac"
-        print(f"\n\n")
+def optimize_for_cpu(model, dtype="int8", compile=False):
+    """
+    Return a copy of `model` that runs faster on the CPU. Quantized modules
+    are new, so `model` keeps its fp32 weights; other submodules are shared.
+
+    dtype="int8" quantizes the Linear layers of the T3 transformer and the
+    S3Gen decoder to int8 with dynamic activation scales; dtype="bf16" runs
+    generate under bf16 autocast, which is only faster on CPUs with native
+    bf16 (AVX512-BF16 or AMX). `compile` runs the T3 transformer through
+    torch.compile, at the cost of a slow first sentence.
+    """
+    import torch
+    fast = copy.copy(model)
+    if dtype == "int8":
+        for name in ("t3", "s3gen"):
+            module = torch.ao.quantization.quantize_dynamic(getattr(model, name), {torch.nn.Linear}, dtype=torch.qint8)
+            setattr(fast, name, module)
+    elif dtype == "bf16":
+        generate = fast.generate
+        def generate_bf16(*args, **kwargs):
+            with torch.autocast("cpu", dtype=torch.bfloat16):
+                return generate(*args, **kwargs)
+        fast.generate = generate_bf16
+    if compile:
+        fast.t3.tfmr = torch.compile(fast.t3.tfmr, dynamic=True)
+    fast.precision = f"{dtype}-compiled" if compile else dtype
+    print(f"CPU fast mode: {dtype}{', compiled' if compile else ''}")
+    return fast
+
+def model_precision(model):
+    # Set by optimize_for_cpu, any other model runs in fp32
+    return getattr(model, "precision", "fp32")
+
+# Fixed sentences --cpu-fast-check reads with both models
+CPU_CHECK_SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "It was the best of times, it was the worst of times, it was the age of wisdom.",
+    "She paused at the door, listening, and then stepped out into the rain.",
+    "How many miles is it to the nearest town, and will we get there before dark?",
+]
+
+# A fast model passes the check when every sentence is within these limits of fp32
+CPU_CHECK_MAX_LENGTH_CHANGE = 0.25
+CPU_CHECK_MIN_SIMILARITY = 0.9
+
+def average_spectrum(audio, frame=1024):
+    # Mean log-magnitude spectrum, which does not depend on where each word falls
+    audio = np.pad(audio, (0, max(0, frame - len(audio))))
+    frames = len(audio) // frame
+    windowed = audio[:frames * frame].reshape(frames, frame) * np.hanning(frame)
+    return np.log1p(np.abs(np.fft.rfft(windowed, axis=1)).mean(axis=0))
 
-        if os.path.isfile(partname):
+def spectral_similarity(a, b):
+    a, b = average_spectrum(a), average_spectrum(b)
+    return float(np.dot(a, b) / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-12))
+
+def time_sentences(model, sentences, sample, exaggeration, cfg_weight):
+    import torch
+    kwargs = {} if sample == "none" else {"exaggeration": exaggeration, "cfg_weight": cfg_weight}
+    # Warm up caches and any compiled graph before timing
+    model.generate(sentences[0], **kwargs)
+    results = []
+    for sentence in sentences:
+        torch.manual_seed(0)
+        start = time.perf_counter()
+        wav = to_pcm(model.generate(sentence, **kwargs))
+        results.append((time.perf_counter() - start, wav))
+    return results
+
+def check_cpu_fast(cpu_fast, sample, exaggeration, cfg_weight, threads=None, interop_threads=None):
+    """
+    Read CPU_CHECK_SENTENCES with the fp32 model and with the --cpu-fast model
+    on this host, and report the latency of each with how close the fast
+    output is to fp32. Returns True when every sentence is within the limits.
+    """
+    model = load_model("cpu", threads=threads, interop_threads=interop_threads)
+    if sample != "none":
+        load_conditionals(model, sample, exaggeration)
+    reference = time_sentences(model, CPU_CHECK_SENTENCES, sample, exaggeration, cfg_weight)
+    fast = optimize_for_cpu(model, **cpu_fast)
+    results = time_sentences(fast, CPU_CHECK_SENTENCES, sample, exaggeration, cfg_weight)
+    passed = True
+    print(f"{'fp32 s':>8} {'fast s':>8} {'speedup':>8} {'length':>8} {'similar':>8}  sentence")
+    for sentence, (ref_seconds, ref_wav), (seconds, wav) in zip(CPU_CHECK_SENTENCES, reference, results):
+        length_change = len(wav) / max(len(ref_wav), 1) - 1
+        similarity = spectral_similarity(ref_wav, wav)
+        ok = abs(length_change) <= CPU_CHECK_MAX_LENGTH_CHANGE and similarity >= CPU_CHECK_MIN_SIMILARITY
+        passed = passed and ok
+        print(f"{ref_seconds:8.2f} {seconds:8.2f} {ref_seconds / seconds:7.2f}x {length_change:+8.0%} {similarity:8.3f}  "
+              f"{'' if ok else 'FAIL '}{sentence}")
+    ref_mean = sum(seconds for seconds, _ in reference) / len(reference)
+    mean = sum(seconds for seconds, _ in results) / len(results)
+    print(f"Mean latency per sentence: fp32 {ref_mean:.2f}s, {cpu_fast['dtype']} {mean:.2f}s, {ref_mean / mean:.2f}x faster. "
+          f"Quality check {'passed' if passed else 'failed'}")
+    return passed
+
+def read_chapter(i, chapter, model, sample, exaggeration, cfg_weight, cache=None, max_tokens=0,
+                 telemetry=None, postprocess=None, guard=None):
+    """
+    Read one chapter and return (int16 audio, sentence count, seconds of speech,
+    sentences that failed).
+    """
+    paragraphpause = 600  # default pause between paragraphs in ms
+    paragraphs = []
+    sentence_count = 0
+    audio_seconds = 0.0
+    failed = 0
+    for pindex in range(len(chapter)):
+        sentences = model_inputs(chapter.sentences(pindex), model.tokenizer, max_tokens)
+        sentence_wavs = chatterbox_read(sentences, sample, model, exaggeration, cfg_weight, cache, telemetry,
+                                        (i, pindex), guard=guard)
+        sentence_count += len(sentences)
+        failed += len(sentences) - len(sentence_wavs)
+        audio_seconds += sum(len(wav) for wav in sentence_wavs) / model.sr
+        paragraphs.append(sentence_wavs)
+        if telemetry is not None:
+            telemetry.emit("paragraph", chapter=i, paragraph=pindex, **telemetry.summary((i, pindex)))
+    # Sentences and pauses are joined in memory, the chapter is encoded once
+    audio = assemble_chapter(paragraphs, model.sr, paragraphpause, **(postprocess or {}))
+    return audio, sentence_count, audio_seconds, failed
+
+# Per-process state of the --workers pool, set up once by init_worker
+worker_state = {}
+
+def init_worker(model_loader, threads, sample, exaggeration, cfg_weight, cache_bytes, max_tokens,
+                profiling=None, postprocess=None, runaway_ratio=0):
+    import torch
+    torch.set_num_threads(threads)
+    model = model_loader()
+    if sample != "none":
+        load_conditionals(model, sample, exaggeration)
+    cache = None
+    if cache_bytes:
+        cache = SentenceCache(sample, exaggeration, cfg_weight, cache_bytes, model_precision(model))
+    # Events are kept in memory and sent back with each chapter
+    telemetry = None
+    if profiling is not None:
+        telemetry = Telemetry(None, *profiling)
+    worker_state.update(
+        model=model,
+        sample=sample,
+        exaggeration=exaggeration,
+        cfg_weight=cfg_weight,
+        cache=cache,
+        max_tokens=max_tokens,
+        telemetry=telemetry,
+        postprocess=postprocess,
+        guard=RunawayGuard(runaway_ratio) if runaway_ratio else None,
+    )
+
+def worker_read_chapter(task):
+    i, chapter_task = task
+    chapter = load_chapter(chapter_task)
+    model = worker_state["model"]
+    telemetry = worker_state["telemetry"]
+    print(f"Chapter {i} ({os.getpid()}): {chapter.title}")
+    audio, sentence_count, audio_seconds, failed = read_chapter(i, chapter, model, worker_state["sample"], worker_state["exaggeration"],
+                                                        worker_state["cfg_weight"], worker_state["cache"],
+                                                        worker_state["max_tokens"], telemetry, worker_state["postprocess"],
+                                                        worker_state["guard"])
+    events = []
+    if telemetry is not None:
+        events, telemetry.events = telemetry.events, []
+    return i, audio, model.sr, sentence_count, audio_seconds, failed, events
+
+def read_chapters_parallel(chapters, workers, model_loader, sample, exaggeration, cfg_weight, cache, max_tokens=0,
+                           telemetry=None, postprocess=None, runaway_ratio=0):
+    """
+    Read (index, Book.chapter_task) pairs in a pool of `workers` processes, yielding
+    (index, audio, sr, sentence count, seconds of speech, failed sentences,
+    telemetry events)
+    as chapters finish.
+
+    Every worker loads the model once and uses an equal share of the CPU
+    threads. Chapters are handed out one at a time in the order given,
+    longest first from read_book, so the last chapters to finish are short
+    ones. Each worker reads and splits its own chapters from the book file.
+    A worker that fails to start, e.g. because the model cannot load,
+    raises BrokenProcessPool here.
+    """
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    cache_bytes = cache.max_bytes if cache is not None else 0
+    profiling = None
+    if telemetry is not None:
+        profiling = (telemetry.profile_every, telemetry.profile_dir)
+    # Forked torch state is not safe to reuse, start clean interpreters
+    context = multiprocessing.get_context("spawn")
+    # A failed init_worker breaks the executor, multiprocessing.Pool would respawn it forever
+    executor = ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                   initargs=(model_loader, threads, sample, exaggeration, cfg_weight, cache_bytes,
+                                             max_tokens, profiling, postprocess, runaway_ratio))
+    try:
+        # Work is handed to the processes in submission order
+        futures = [executor.submit(worker_read_chapter, task) for task in chapters]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# A lease that has not had a heartbeat for this long is given to another worker
+LEASE_SECONDS = 120
+HEARTBEAT_SECONDS = 20
+# How often the coordinator and idle workers look at a --distribute queue
+QUEUE_POLL_SECONDS = 2
+
+def write_atomic(path, data):
+    temp_path = temp_name(path)
+    with open(temp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+class WorkQueue:
+    """
+    Queue of chapters to read in a directory that every node can see.
+
+    units/ holds one JSON file per chapter to read. A worker claims a unit
+    by creating its file in leases/ exclusively, and keeps the lease alive
+    by bumping a heartbeat counter in it. The audio and counts of a finished
+    unit go to results/, where the .json is written last and marks the
+    result complete. Only the first worker to finish a unit writes one.
+    Lease expiry is judged by the coordinator from how long it has seen a
+    lease unchanged on its own clock, so the clocks of the nodes do not
+    have to agree.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.units = os.path.join(directory, "units")
+        self.leases = os.path.join(directory, "leases")
+        self.results = os.path.join(directory, "results")
+        for path in (self.units, self.leases, self.results):
+            os.makedirs(path, exist_ok=True)
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        # Lease id -> (content, when the coordinator first saw it)
+        self.seen = {}
+
+    def path(self, kind, unit_id, ext=".json"):
+        return os.path.join(getattr(self, kind), unit_id + ext)
+
+    def publish(self, unit_id, unit):
+        write_atomic(self.path("units", unit_id), json.dumps(unit).encode("utf-8"))
+
+    def has_result(self, unit_id):
+        return os.path.isfile(self.path("results", unit_id))
+
+    def claim(self):
+        """Lease the first free unit, returning (unit id, unit) or None."""
+        for name in sorted(os.listdir(self.units)):
+            if not name.endswith(".json"):
+                continue
+            unit_id = name[:-len(".json")]
+            if self.has_result(unit_id):
+                continue
+            try:
+                fd = os.open(self.path("leases", unit_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, "w") as file:
+                json.dump({"worker": self.worker, "beat": 0}, file)
+            try:
+                with open(self.path("units", unit_id), "r", encoding="utf-8") as file:
+                    return unit_id, json.load(file)
+            except FileNotFoundError:
+                # Finished by another worker in the meantime
+                self.release(unit_id)
+        return None
+
+    def lease(self, unit_id):
+        try:
+            with open(self.path("leases", unit_id), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @contextlib.contextmanager
+    def heartbeat(self, unit_id, interval=HEARTBEAT_SECONDS):
+        stop = threading.Event()
+        def beat():
+            while not stop.wait(interval):
+                lease = self.lease(unit_id)
+                if lease is None or lease["worker"] != self.worker:
+                    # Expired and handed to another worker, whoever finishes first wins
+                    return
+                lease["beat"] += 1
+                write_atomic(self.path("leases", unit_id), json.dumps(lease).encode("utf-8"))
+        thread = threading.Thread(target=beat, name="heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def release(self, unit_id):
+        lease = self.lease(unit_id)
+        if lease is not None and lease["worker"] == self.worker:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path("leases", unit_id))
+
+    def complete(self, unit_id, audio, sr, sentence_count, audio_seconds, failed):
+        if self.has_result(unit_id) or not os.path.isfile(self.path("units", unit_id)):
+            # Finished by the worker the lease was handed to, and maybe collected already
+            self.release(unit_id)
+            return
+        buffer = io.BytesIO()
+        np.save(buffer, audio)
+        write_atomic(self.path("results", unit_id, ".npy"), buffer.getvalue())
+        meta = {"sr": sr, "sentences": sentence_count, "audio_seconds": audio_seconds, "failed": failed,
+                "worker": self.worker}
+        write_atomic(self.path("results", unit_id), json.dumps(meta).encode("utf-8"))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path("units", unit_id))
+        self.release(unit_id)
+
+    def result(self, unit_id):
+        with open(self.path("results", unit_id), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        return np.load(self.path("results", unit_id, ".npy")), meta
+
+    def remove_result(self, unit_id):
+        for ext in (".npy", ".json"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path("results", unit_id, ext))
+
+    def reap(self, lease_seconds=LEASE_SECONDS):
+        """Remove the leases that have not changed for `lease_seconds`, so their units are claimed again."""
+        now = time.time()
+        current = {}
+        for name in os.listdir(self.leases):
+            if not name.endswith(".json"):
+                continue
+            unit_id = name[:-len(".json")]
+            try:
+                with open(os.path.join(self.leases, name), "r", encoding="utf-8") as file:
+                    content = file.read()
+            except FileNotFoundError:
+                continue
+            seen_content, since = self.seen.get(unit_id, (None, now))
+            if content != seen_content:
+                since = now
+            if now - since > lease_seconds:
+                print(f"Lease on {unit_id} expired, handing it to another worker")
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.leases, name))
+                continue
+            current[unit_id] = (content, since)
+        self.seen = current
+
+def read_chapters_distributed(chapters, queue_dir, settings, lease_seconds=None, poll=None):
+    """
+    Read (index, Book.chapter_task) pairs with the workers of a WorkQueue,
+    yielding the same tuples as read_chapters_parallel as chapters finish.
+
+    Units are named after the book, its settings and the chapter's text, so
+    several books can share one queue, a restarted coordinator picks up
+    results that finished while it was gone, and a result left from before
+    the book was edited is never taken for the new text.
+    """
+    lease_seconds = lease_seconds or LEASE_SECONDS
+    poll = poll or QUEUE_POLL_SECONDS
+    work = WorkQueue(queue_dir)
+    pending = {}
+    for i, (sourcefile, title, ranges, read_title) in chapters:
+        sourcefile = os.path.abspath(sourcefile)
+        paragraphs, _ = chapter_paragraphs((sourcefile, title, ranges, read_title))
+        key = json.dumps([sourcefile, settings, title, read_title, paragraphs], sort_keys=True)
+        unit_id = f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}-{i:05d}"
+        pending[unit_id] = i
+        if not work.has_result(unit_id):
+            work.publish(unit_id, {"chapter": i, "task": [sourcefile, title, list(ranges), read_title], **settings})
+    print(f"Published {len(pending)} chapters to {queue_dir}")
+    while pending:
+        for unit_id in [unit_id for unit_id in pending if work.has_result(unit_id)]:
+            audio, meta = work.result(unit_id)
+            print(f"Chapter {pending[unit_id]} read by {meta['worker']}")
+            yield pending.pop(unit_id), audio, meta["sr"], meta["sentences"], meta["audio_seconds"], meta["failed"], []
+            work.remove_result(unit_id)
+        if pending:
+            work.reap(lease_seconds)
+            time.sleep(poll)
+
+def run_worker(queue_dir, model_loader=load_model, cache_bytes=0, telemetry=None, idle_exit=0,
+               poll=QUEUE_POLL_SECONDS, heartbeat=HEARTBEAT_SECONDS):
+    """
+    Read chapters from a WorkQueue until it has been empty for `idle_exit`
+    seconds, or forever with 0. The model is loaded with the first unit and
+    the voice conditioning is only recomputed when the sample changes.
+    """
+    work = WorkQueue(queue_dir)
+    model = None
+    default_conds = None
+    voice = None
+    guard = None
+    idle_since = time.time()
+    print(f"Worker {work.worker} reading from {queue_dir}")
+    while True:
+        claimed = work.claim()
+        if claimed is None:
+            if idle_exit and time.time() - idle_since > idle_exit:
+                break
+            time.sleep(poll)
+            continue
+        unit_id, unit = claimed
+        with work.heartbeat(unit_id, heartbeat):
+            if model is None:
+                model = model_loader()
+                default_conds = model.conds
+            sample = unit["sample"]
+            if (sample, unit["exaggeration"]) != voice:
+                if sample == "none":
+                    model.conds = default_conds
+                else:
+                    load_conditionals(model, sample, unit["exaggeration"])
+                voice = (sample, unit["exaggeration"])
+            cache = None
+            if cache_bytes:
+                cache = SentenceCache(sample, unit["exaggeration"], unit["cfg_weight"], cache_bytes,
+                                      model_precision(model))
+            ratio = unit.get("runaway_ratio", 0)
+            if not ratio:
+                guard = None
+            elif guard is None or guard.ratio != ratio:
+                guard = RunawayGuard(ratio)
+            i = unit["chapter"]
+            chapter = load_chapter(tuple(unit["task"]))
+            print(f"Chapter {i} ({unit_id}): {chapter.title}")
+            audio, sentence_count, audio_seconds, failed = read_chapter(
+                i, chapter, model, sample, unit["exaggeration"], unit["cfg_weight"], cache,
+                unit["max_tokens"], telemetry, unit["postprocess"], guard)
+        work.complete(unit_id, audio, model.sr, sentence_count, audio_seconds, failed)
+        idle_since = time.time()
+
+class StageQueue(queue.Queue):
+    """Bounded queue between read_book pipeline stages that tracks how full it runs."""
+
+    def __init__(self):
+        super().__init__(PIPELINE_DEPTH)
+        self.depth_total = 0
+        self.gets = 0
+
+    def get(self, *args, **kwargs):
+        self.depth_total += self.qsize()
+        self.gets += 1
+        return super().get(*args, **kwargs)
+
+    def average_depth(self):
+        return self.depth_total / max(self.gets, 1)
+
+class TextStage(threading.Thread):
+    """
+    First read_book pipeline stage: split paragraphs into cleaned sentences
+    ahead of synthesis and queue them in reading order.
+    """
+
+    def __init__(self, book, pending, tokenizer=None, max_tokens=0):
+        super().__init__(name="text", daemon=True)
+        self.book = book
+        self.pending = set(pending)
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.queue = StageQueue()
+        self.busy = 0.0
+        self.stopped = threading.Event()
+
+    def stop(self):
+        # Make room so a put blocked on a full queue returns and sees the flag
+        self.stopped.set()
+        with contextlib.suppress(queue.Empty):
+            while True:
+                self.queue.get_nowait()
+
+    def run(self):
+        try:
+            for i in range(1, len(self.book) + 1):
+                if self.stopped.is_set():
+                    return
+                if i not in self.pending:
+                    self.queue.put(("skip", i))
+                    continue
+                self.queue.put(("start", i))
+                start = time.time()
+                chapter = self.book.chapter(i)
+                self.busy += time.time() - start
+                for pindex in range(len(chapter)):
+                    start = time.time()
+                    sentences = model_inputs(chapter.sentences(pindex), self.tokenizer, self.max_tokens)
+                    self.busy += time.time() - start
+                    self.queue.put(("paragraph", i, pindex, sentences, chapter.sizes[pindex]))
+                    if self.stopped.is_set():
+                        return
+                self.queue.put(("end", i))
+        except Exception as e:
+            self.queue.put(("error", e))
+        self.queue.put(None)
+
+class WriterStage(threading.Thread):
+    """
+    Last read_book pipeline stage: add the pauses, join each chapter, write its
+    resume checkpoint and feed it to the encoder while the model keeps going.
+    """
+
+    def __init__(self, encoder, journal, postprocess=None, keys=None):
+        super().__init__(name="writer", daemon=True)
+        self.encoder = encoder
+        self.journal = journal
+        # chapter_key of every chapter, recorded in the journal
+        self.keys = keys or {}
+        self.postprocess = postprocess or {}
+        self.queue = StageQueue()
+        self.paragraphs = []
+        self.busy = 0.0
+        self.error = None
+
+    def run(self):
+        for item in iter(self.queue.get, None):
+            if self.error is not None:
+                # Keep draining so the synthesis stage never blocks on a dead writer
+                continue
+            start = time.time()
+            try:
+                self.handle(*item)
+            except Exception as e:
+                self.error = e
+            self.busy += time.time() - start
+
+    def handle(self, kind, i, *args):
+        import soundfile as sf
+        partname = f"part{i}.flac"
+        if kind == "skip":
             print(f"{partname} exists, skipping to next chapter")
-            segments.append(partname)
+            if self.encoder is not None:
+                audio, sr = sf.read(partname, dtype="int16")
+                self.encoder.add_chapter(audio, sr)
+            return
+        if kind == "paragraph":
+            self.paragraphs.append(args[0])
+            return
+        if kind == "end":
+            sr, failed = args
+            audio = assemble_chapter(self.paragraphs, sr, **self.postprocess)
+            self.paragraphs = []
         else:
-            print(f"Chapter ({i}/{len(book_contents)}): {chapter['title']}\n")
-            print(f"Section name: \"{chapter['title']}\"")
-            if chapter["title"] == "":
-                chapter["title"] = "blank"
-            if chapter["title"] != "Title" and notitles != True:
-                chapter['paragraphs'][0] = chapter['title'] + ". " + chapter['paragraphs'][0]
-            for pindex, paragraph in enumerate(chapter["paragraphs"]):
-                ptemp = f"pgraphs{pindex}.flac"
-                if os.path.isfile(ptemp):
-                    print(f"{ptemp} exists, skipping to next paragraph")
-                else:
-                    sentences = sent_tokenize(paragraph)
-                    # This is probably not needed, commenting out for now
-                    # sentences = fix_sentence_length(sentences)
-                    filenames = [
-                        "sntnc" + str(z) + ".wav" for z in range(len(sentences))
-                    ]
-                    chatterbox_read(sentences, sample, filenames, model, exaggeration, cfg_weight)
-                    append_silence(filenames[-1], paragraphpause)
-                    # combine sentences in paragraph
-                    sorted_files = sorted(filenames, key=sort_key)
-                    #if os.path.exists("sntnc0.wav"):
-                    #    sorted_files.insert(0, "sntnc0.wav")
-                    combined = AudioSegment.empty()
-                    for file in sorted_files:
-                        # try/except prob not needed, actual failure was from a torch recursive error that was fixed
-                        try:
-                            combined += AudioSegment.from_file(file)
-                        except:
-                            print("FAILURE at sorted file combine")
-                            print(f"File: {file}")
-                            print(f"sorted files: {sorted_files}")
-                            print(f"Unsorted: {filenames}")
-                            sys.exit()
-                    combined.export(ptemp, format="flac")
-                    for file in sorted_files:
-                        os.remove(file)
-                files.append(ptemp)
-            # combine paragraphs into chapter
-            append_silence(files[-1], 2000)
-            combined = AudioSegment.empty()
-            for file in files:
-                combined += AudioSegment.from_file(file)
-            combined.export(partname, format="flac")
-            for file in files:
-                os.remove(file)
-            segments.append(partname)
-    return segments
-
-def generate_metadata(files, author, title, chapter_titles):
+            # Whole chapter read by a --workers process
+            audio, sr, failed = args
+        # partN.flac is only kept so an interrupted run can resume
+        self.journal.write_chapter(partname, audio, sr, failed, self.keys.get(i))
+        if self.encoder is not None:
+            self.encoder.add_chapter(audio, sr)
+
+# Length of the --stream HLS segments, and so roughly the time to first audio after the first sentence
+STREAM_SEGMENT_SECONDS = 2
+
+class AudioStream:
+    """
+    Listen to a book while it is being read: a rolling HLS playlist,
+    `stream.m3u8` in `directory`, that gets every sentence as soon as it is
+    generated. Pauses and trimming follow `postprocess` like the m4b, but
+    loudness is not normalized since that needs the whole chapter. Chapter
+    starts are written to `chapters.jsonl` next to the playlist, and sent to
+    the Telemetry as `stream_chapter` events, with their offset in seconds.
+    """
+
+    def __init__(self, directory, postprocess=None, telemetry=None):
+        self.directory = directory
+        self.postprocess = postprocess or {}
+        self.telemetry = telemetry
+        self.process = None
+        self.sr = None
+        self.samples = 0
+        self.started = time.time()
+        self.in_paragraph = False
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name == "stream.m3u8" or name == "chapters.jsonl" or name.startswith("segment"):
+                os.remove(os.path.join(directory, name))
+
+    def write(self, audio, sr):
+        if self.process is None:
+            self.sr = sr
+            ffmpeg_command = [
+                "ffmpeg",
+                "-y",
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-f",
+                "s16le",
+                "-ar",
+                str(sr),
+                "-ac",
+                "1",
+                "-i",
+                "pipe:0",
+                "-codec:a",
+                "aac",
+                "-f",
+                "hls",
+                "-hls_time",
+                str(STREAM_SEGMENT_SECONDS),
+                "-hls_list_size",
+                "0",
+                "-hls_playlist_type",
+                "event",
+                "-hls_segment_filename",
+                os.path.join(self.directory, "segment%05d.ts"),
+                os.path.join(self.directory, "stream.m3u8"),
+            ]
+            self.process = subprocess.Popen(ffmpeg_command, stdin=subprocess.PIPE)
+            print(f"First audio {time.time() - self.started:.1f}s after the start, "
+                  f"listen with: ffplay {os.path.join(self.directory, 'stream.m3u8')}")
+            if self.telemetry is not None:
+                self.telemetry.emit("first_audio", seconds=round(time.time() - self.started, 3))
+        self.process.stdin.write(np.ascontiguousarray(audio, dtype=np.int16).tobytes())
+        self.process.stdin.flush()
+        self.samples += len(audio)
+
+    def pause(self, duration):
+        if self.sr is not None and duration:
+            self.write(to_int16(silence(self.sr, duration)), self.sr)
+
+    def chapter(self, i, title):
+        start = self.samples / self.sr if self.sr else 0.0
+        with open(os.path.join(self.directory, "chapters.jsonl"), "a", encoding="utf-8") as file:
+            file.write(json.dumps({"chapter": i, "title": title, "start": round(start, 3)}) + "\n")
+        if self.telemetry is not None:
+            self.telemetry.emit("stream_chapter", chapter=i, title=title, start=round(start, 3))
+
+    def sentence(self, wav, sr):
+        if self.in_paragraph and self.sr is not None:
+            self.pause(self.postprocess.get("sentencepause", 0))
+        if self.postprocess.get("trim"):
+            wav = trim_silence(wav, sr)
+        self.write(to_int16(wav), sr)
+        self.in_paragraph = True
+
+    def paragraph_end(self, paragraphpause=600):
+        self.pause(paragraphpause)
+        self.in_paragraph = False
+
+    def chapter_end(self, chapterpause=2000):
+        self.pause(chapterpause)
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+
+def remaining_time(done, total, elapsed):
+    # Seconds left at the rate so far, by characters of text read
+    return round(elapsed * (total - done) / done, 1) if done else None
+
+def read_book(book, sample, notitles, exaggeration, cfg_weight, encoder=None, cache=None,
+              workers=1, model_loader=load_model, max_tokens=0, stats=None, telemetry=None, journal=None,
+              postprocess=None, queue_dir=None, stream=None, runaway_ratio=0):
+    """
+    Read a Book to partN.flac files, returning their names in order.
+
+    Reading runs as a pipeline of bounded queues: a text thread splits
+    chapters ahead, the calling thread only runs the model, and a writer
+    thread assembles, saves and encodes finished chapters. With `workers` > 1
+    whole chapters are read by a process pool instead of the calling thread,
+    and with a `queue_dir` by `worker` processes on any node sharing it.
+    If a `stats` dict is given it is filled with the timings and counts of the run,
+    and a Telemetry gets per-sentence, paragraph and chapter events as they happen.
+    Chapters the Journal has as complete are not read again. `postprocess`
+    holds the trim, sentencepause and loudness options of assemble_chapter.
+    An AudioStream `stream` gets every sentence as it is read, or with
+    `workers` or `queue_dir` every chapter as it is done. With a
+    `runaway_ratio` a RunawayGuard checks every generated sentence.
+    """
+    book.read_titles = notitles != True
+    if journal is None:
+        journal = Journal()
+    # A chapter is only skipped if its part was read from the same text with the same settings
+    read_settings = {
+        "sample": sample if sample == "none" else file_hash(sample),
+        "exaggeration": exaggeration,
+        "cfg_weight": cfg_weight,
+        "max_tokens": max_tokens,
+        "postprocess": postprocess,
+        "runaway_ratio": runaway_ratio,
+    }
+    keys = {i: chapter_key(book.chapter_task(i), read_settings) for i in range(1, len(book) + 1)}
+    pending = [i for i in range(1, len(book) + 1) if not journal.complete(f"part{i}.flac", keys[i])]
+
+    model = None
+    guard = None
+    results = None
+    load_start = time.time()
+    if queue_dir is not None:
+        settings = {
+            "sample": sample if sample == "none" else os.path.abspath(sample),
+            "exaggeration": exaggeration,
+            "cfg_weight": cfg_weight,
+            "max_tokens": max_tokens,
+            "postprocess": postprocess,
+            "runaway_ratio": runaway_ratio,
+        }
+        results = read_chapters_distributed([(i, book.chapter_task(i)) for i in pending], queue_dir, settings)
+    elif workers > 1:
+        todo = [(i, book.chapter_task(i)) for i in sorted(pending, key=book.chapter_size, reverse=True)]
+        results = read_chapters_parallel(todo, workers, model_loader, sample, exaggeration, cfg_weight, cache,
+                                         max_tokens, telemetry, postprocess, runaway_ratio)
+    else:
+        model = model_loader()
+        if sample != "none":
+            load_conditionals(model, sample, exaggeration)
+        if cache is not None:
+            # The cache is made before the model is loaded, and only now is its precision known
+            cache.set_precision(model_precision(model))
+        if runaway_ratio:
+            guard = RunawayGuard(runaway_ratio)
+    start_time = time.time()
+    sentence_count = 0
+    audio_seconds = 0.0
+    synthesis_busy = 0.0
+    # Progress is counted in bytes of paragraph text
+    total_chars = sum(book.chapter_size(i) for i in pending)
+    done_chars = 0
+    if telemetry is not None:
+        telemetry.emit("start", chapters=len(book), chars=total_chars, workers=workers,
+                       max_tokens=max_tokens, model_load=round(start_time - load_start, 3))
+
+    writer = WriterStage(encoder, journal, postprocess, keys)
+    writer.start()
+    text = None
+    try:
+        if results is not None:
+            finished = {}
+            for i in range(1, len(book) + 1):
+                if i not in pending:
+                    if telemetry is not None:
+                        telemetry.emit("skip", chapter=i)
+                    writer.queue.put(("skip", i))
+                    continue
+                # Chapters finish out of order, keep the later ones until their turn
+                while i not in finished:
+                    j, *result = next(results)
+                    finished[j] = result
+                audio, sr, chapter_sentences, chapter_seconds, chapter_failed, events = finished.pop(i)
+                print(f"Chapter ({i}/{len(book)}): {book.titles[i - 1]} done")
+                sentence_count += chapter_sentences
+                audio_seconds += chapter_seconds
+                done_chars += book.chapter_size(i)
+                if telemetry is not None:
+                    telemetry.replay(events)
+                    telemetry.emit("chapter", chapter=i, title=book.titles[i - 1], **telemetry.summary(i),
+                                   progress=round(done_chars / max(total_chars, 1), 4),
+                                   eta_seconds=remaining_time(done_chars, total_chars, time.time() - start_time))
+                if stream is not None:
+                    stream.chapter(i, book.titles[i - 1])
+                    stream.write(audio, sr)
+                writer.queue.put(("chapter", i, audio, sr, chapter_failed))
+            results.close()
+        else:
+            text = TextStage(book, pending, model.tokenizer, max_tokens)
+            text.start()
+            chapter_failed = 0
+            for item in iter(text.queue.get, None):
+                kind, i = item[0], item[1]
+                if kind == "error":
+                    raise item[1]
+                if kind == "skip" and telemetry is not None:
+                    telemetry.emit("skip", chapter=i)
+                if kind == "start":
+                    title = book.titles[i - 1]
+                    if stream is not None:
+                        stream.chapter(i, title)
+                    print(f"\n\n")
+                    print(f"Chapter ({i}/{len(book)}): {title}\n")
+                    print(f"Section name: \"{title}\"")
+                    continue
+                if kind == "paragraph":
+                    _, i, pindex, sentences, size = item
+                    start = time.time()
+                    on_audio = None
+                    if stream is not None:
+                        on_audio = partial(stream.sentence, sr=model.sr)
+                    sentence_wavs = chatterbox_read(sentences, sample, model, exaggeration, cfg_weight, cache, telemetry,
+                                                    (i, pindex), on_audio, guard)
+                    if stream is not None:
+                        stream.paragraph_end()
+                    synthesis_busy += time.time() - start
+                    sentence_count += len(sentences)
+                    chapter_failed += len(sentences) - len(sentence_wavs)
+                    audio_seconds += sum(len(wav) for wav in sentence_wavs) / model.sr
+                    done_chars += size
+                    if telemetry is not None:
+                        telemetry.emit("paragraph", chapter=i, paragraph=pindex, **telemetry.summary((i, pindex)),
+                                       progress=round(done_chars / max(total_chars, 1), 4),
+                                       eta_seconds=remaining_time(done_chars, total_chars, time.time() - start_time))
+                    item = ("paragraph", i, sentence_wavs)
+                elif kind == "end":
+                    if stream is not None:
+                        stream.chapter_end()
+                    if telemetry is not None:
+                        telemetry.emit("chapter", chapter=i, title=book.titles[i - 1], **telemetry.summary(i),
+                                       progress=round(done_chars / max(total_chars, 1), 4),
+                                       eta_seconds=remaining_time(done_chars, total_chars, time.time() - start_time))
+                    item = ("end", i, model.sr, chapter_failed)
+                    chapter_failed = 0
+                writer.queue.put(item)
+    except BaseException:
+        # Stop both stages and the chapter encodes, so a book that fails in a
+        # --manifest or --watch run leaves no threads or ffmpeg processes behind
+        if text is not None:
+            text.stop()
+        if results is not None:
+            results.close()
+        writer.queue.put(None)
+        writer.join()
+        if encoder is not None:
+            encoder.abort()
+        raise
+    writer.queue.put(None)
+    writer.join()
+    if writer.error is not None:
+        if encoder is not None:
+            encoder.abort()
+        raise writer.error
+
+    elapsed = time.time() - start_time
+    run_stats = dict(
+        model_load=start_time - load_start,
+        read=elapsed,
+        inputs=sentence_count,
+        audio_seconds=audio_seconds,
+        text_busy=text.busy if text is not None else None,
+        synthesis_busy=synthesis_busy if text is not None else None,
+        writer_busy=writer.busy,
+    )
+    if stats is not None:
+        stats.update(run_stats)
+    if telemetry is not None:
+        telemetry.emit("done", **{name: value if value is None else round(value, 4) for name, value in run_stats.items()},
+                       real_time_factor=real_time_factor(elapsed, audio_seconds))
+    if sentence_count:
+        print(f"Read {sentence_count} model inputs ({audio_seconds:.0f}s of audio) in {elapsed:.0f}s, "
+              f"{workers} worker(s), max tokens {max_tokens or 'off'}: "
+              f"{sentence_count / elapsed:.2f} inputs/s, "
+              f"real-time factor {elapsed / max(audio_seconds, 1e-9):.2f}")
+    if text is not None:
+        # A stage that is busy most of the time while its input queue stays full is the bottleneck
+        print(f"Stage busy time: text {text.busy:.1f}s, synthesis {synthesis_busy:.1f}s, writer {writer.busy:.1f}s. "
+              f"Average queue depth: text {text.queue.average_depth():.1f}/{PIPELINE_DEPTH}, "
+              f"writer {writer.queue.average_depth():.1f}/{PIPELINE_DEPTH}")
+    return [f"part{i}.flac" for i in range(1, len(book) + 1)]
+
+def chapter_duration(samples, sr):
+    # Same rounding as len(AudioSegment), so chapter marks match the old pydub timing
+    return round(1000 * (samples / sr))
+
+class Journal:
+    """
+    Crash-safe record of the chapters of a read, one JSON object per line.
+
+    A chapter is written to a temporary file and renamed into place before
+    its entry is appended, so a partN.flac the journal lists as done is whole
+    and its checksum is known. Each entry also holds the chapter_key of the
+    text and settings it was read from. On a restart only chapters without
+    a done entry, whose file no longer matches or whose text or settings
+    changed are read again. A chapter with
+    sentences that still failed after their retries is journaled as failed,
+    and is redone by the next run.
+    """
+
+    def __init__(self, path=JOURNAL):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Last line cut short by a crash
+                        continue
+                    self.entries[entry["part"]] = entry
+
+    def append(self, entry):
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            self.entries[entry["part"]] = entry
+
+    def write_chapter(self, partname, audio, sr, failed=0, key=None):
+        import soundfile as sf
+        temp_path = partname + ".tmp"
+        with open(temp_path, "wb") as file:
+            sf.write(file, audio, sr, format="FLAC")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, partname)
+        self.append({
+            "part": partname,
+            "state": "failed" if failed else "done",
+            "sha256": file_hash(partname),
+            "samples": len(audio),
+            "sr": sr,
+            "failed_sentences": failed,
+            "key": key,
+            "time": round(time.time(), 3),
+        })
+
+    def complete(self, partname, key=None):
+        entry = self.entries.get(partname)
+        if entry is None or entry["state"] != "done" or not os.path.isfile(partname):
+            return False
+        if key is not None and entry.get("key") != key:
+            print(f"{partname} was read from other text or settings, reading it again")
+            return False
+        if file_hash(partname) != entry["sha256"]:
+            print(f"{partname} does not match its journal checksum, reading it again")
+            return False
+        return True
+
+    def failed(self):
+        return sorted(partname for partname, entry in self.entries.items() if entry["state"] == "failed")
+
+    def durations(self):
+        return {partname: chapter_duration(entry["samples"], entry["sr"]) for partname, entry in self.entries.items()}
+
+    def remove(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+def generate_metadata(files, author, title, chapter_titles, journal=None, durations=None):
+    # `durations` in ms, such as M4bEncoder.durations, take precedence over the journal's
     chap = 0
     start_time = 0
+    durations = {**(journal or Journal()).durations(), **(durations or {})}
     with open("FFMETADATAFILE", "w") as file:
         file.write(";FFMETADATA1\n")
         file.write(f"ARTIST={author}\n")
@@ -438,7 +2297,9 @@ def generate_metadata(files, author, title, chapter_titles):
         file.write(f"TITLE={title}\n")
         file.write("DESCRIPTION=Made with https://github.com/aedocw/epub2tts-chatterbox\n")
         for file_name in files:
-            duration = get_duration(file_name)
+            duration = durations.get(file_name)
+            if duration is None:
+                duration = get_duration(file_name)
             file.write("[CHAPTER]\n")
             file.write("TIMEBASE=1/1000\n")
             file.write(f"START={start_time}\n")
@@ -448,75 +2309,385 @@ def generate_metadata(files, author, title, chapter_titles):
             start_time += duration
 
 def get_duration(file_path):
-    audio = AudioSegment.from_file(file_path)
-    duration_milliseconds = len(audio)
-    return duration_milliseconds
-
-def make_m4b(files, sourcefile, speaker):
-    filelist = "filelist.txt"
-    speaker_file = os.path.basename(speaker)
-    basefile = sourcefile.replace(".txt", "")
-    outputm4a = f"{basefile}.m4a"
-    outputm4b = f"{basefile} ({speaker_file.split('.wav')[0]}).m4b"
-    with open(filelist, "w") as f:
-        for filename in files:
-            filename = filename.replace("'", "'\\''")
-            f.write(f"file '{filename}'\n")
-    ffmpeg_command = [
-        "ffmpeg",
-        "-f",
-        "concat",
-        "-safe",
-        "0",
-        "-i",
-        filelist,
-        "-codec:a",
-        "flac",
-        "-f",
-        "mp4",
-        "-strict",
-        "-2",
-        outputm4a,
-    ]
-    subprocess.run(ffmpeg_command)
-    ffmpeg_command = [
-        "ffmpeg",
-        "-i",
-        outputm4a,
-        "-i",
-        "FFMETADATAFILE",
-        "-map_metadata",
-        "1",
-        "-codec",
-        "aac",
-        outputm4b,
-    ]
-    subprocess.run(ffmpeg_command)
-    os.remove(filelist)
-    os.remove("FFMETADATAFILE")
-    os.remove(outputm4a)
-    for f in files:
-        os.remove(f)
-    return outputm4b
+    # Read the length from the file header rather than decoding the audio
+    import soundfile as sf
+    info = sf.info(file_path)
+    return chapter_duration(info.frames, info.samplerate)
 
-def add_cover(cover_img, filename):
-    try:
-        if os.path.isfile(cover_img):
-            m4b = mp4.MP4(filename)
-            cover_image = open(cover_img, "rb").read()
-            m4b["covr"] = [mp4.MP4Cover(cover_image)]
-            m4b.save()
-        else:
+# Default number of ffmpeg processes encoding finished chapters at once
+ENCODE_JOBS = 2
+
+# ffmpeg concat demuxer list of the encoded chapters, written by M4bEncoder.finish
+CONCAT_LIST = "chapters.ffconcat"
+
+# Samples in an AAC frame, and in the priming frame every encode starts with
+AAC_FRAME = 1024
+
+def chapter_span(samples, sr):
+    """
+    Samples a chapter of `samples` takes in an m4b joined from separately
+    encoded chapters: its audio padded with silence to whole AAC frames,
+    plus its own priming frame. Where the unit stays under a second the
+    padding also makes the span whole milliseconds (128 ms at 24 kHz), so
+    chapter marks add up without rounding.
+    """
+    unit = AAC_FRAME
+    per_ms = sr // math.gcd(sr, 1000)
+    exact = AAC_FRAME * per_ms // math.gcd(AAC_FRAME, per_ms)
+    if exact <= sr:
+        unit = exact
+    return -(-(samples + AAC_FRAME) // unit) * unit
+
+class M4bEncoder:
+    """
+    Encode the audiobook to AAC while it is being read.
+
+    Every chapter is piped as raw 16-bit PCM to its own ffmpeg process as
+    soon as it is assembled, with at most `jobs` encodes running, and
+    `finish` joins the encoded chapters with the chapter metadata and cover
+    in a stream copy, so nothing is encoded twice and the mux takes seconds.
+    With `jobs` = 0 the whole book is piped through a single ffmpeg process
+    instead.
+    """
+
+    def __init__(self, sourcefile, speaker, jobs=ENCODE_JOBS):
+        speaker_file = os.path.basename(speaker)
+        basefile = sourcefile.replace(".txt", "").replace(".epub", "")
+        self.outputm4a = f"{basefile}.m4a"
+        self.outputm4b = f"{basefile} ({speaker_file.split('.wav')[0]}).m4b"
+        self.jobs = jobs
+        self.process = None
+        self.pool = None
+        self.slots = None
+        self.encodes = []
+        # chapter_span and sample rate of every chapter encoded on its own
+        self.spans = []
+
+    def pcm_command(self, sr, output):
+        return [
+            "ffmpeg",
+            "-y",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "s16le",
+            "-ar",
+            str(sr),
+            "-ac",
+            "1",
+            "-i",
+            "pipe:0",
+            "-codec:a",
+            "aac",
+            "-f",
+            "mp4",
+            output,
+        ]
+
+    def add_chapter(self, audio, sr):
+        pcm = np.ascontiguousarray(audio, dtype=np.int16).tobytes()
+        if not self.jobs:
+            if self.process is None:
+                self.process = subprocess.Popen(self.pcm_command(sr, self.outputm4a), stdin=subprocess.PIPE)
+            self.process.stdin.write(pcm)
+            return
+        if self.pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.pool = ThreadPoolExecutor(self.jobs, thread_name_prefix="encode")
+            # Chapters waiting for an encoder count too, so at most 2 * jobs are held in memory
+            self.slots = threading.BoundedSemaphore(2 * self.jobs)
+        output = f"part{len(self.encodes) + 1}.m4a"
+        span = chapter_span(len(audio), sr)
+        # Silence up to the span, so the chapter ends on a whole AAC frame
+        pcm += bytes(2 * (span - AAC_FRAME - len(audio)))
+        self.spans.append((span, sr))
+        self.slots.acquire()
+        future = self.pool.submit(self.encode_chapter, pcm, sr, output)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.encodes.append((output, future))
+
+    def encode_chapter(self, pcm, sr, output):
+        result = subprocess.run(self.pcm_command(sr, output), input=pcm)
+        return result.returncode == 0
+
+    def close(self):
+        # Wait for the encodes, returning the ffmpeg input arguments of the whole book or None if one failed
+        if not self.jobs:
+            self.process.stdin.close()
+            if self.process.wait() != 0:
+                return None
+            return ["-i", self.outputm4a]
+        if self.pool is not None:
+            self.pool.shutdown()
+        if not all(future.result() for _, future in self.encodes):
+            return None
+        # Every chapter starts on its own AAC priming frame. Giving each its
+        # whole span lays the packets end to end, where the marks put them
+        with open(CONCAT_LIST, "w") as file:
+            file.write("ffconcat version 1.0\n")
+            for (output, _), (span, sr) in zip(self.encodes, self.spans):
+                file.write(f"file '{output}'\n")
+                file.write(f"duration {span / sr:.6f}\n")
+        return ["-f", "concat", "-safe", "0", "-i", CONCAT_LIST]
+
+    def durations(self):
+        """Length in ms of every chapter in the m4b where it differs from its partN.flac."""
+        return {f"part{i}.flac": chapter_duration(span, sr) for i, (span, sr) in enumerate(self.spans, start=1)}
+
+    def remove_encoded(self):
+        for path in [self.outputm4a, CONCAT_LIST] + [output for output, _ in self.encodes]:
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def abort(self):
+        # Stop the encode of a read that cannot be finished, the next run starts a new one
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.remove_encoded()
+
+    def finish(self, files, cover_img=None):
+        inputs = self.close()
+        if inputs is None:
+            print(f"ffmpeg failed to encode {self.outputm4a}, keeping {files} to retry")
+            self.remove_encoded()
+            sys.exit(1)
+        ffmpeg_command = [
+            "ffmpeg",
+            "-y",
+            *inputs,
+            "-i",
+            "FFMETADATAFILE",
+        ]
+        cover_data = None
+        if isinstance(cover_img, bytes):
+            # A cover read from the epub in memory is piped to ffmpeg
+            cover_data, cover_img = cover_img, "pipe:0"
+        elif cover_img is not None and not os.path.isfile(cover_img):
             print(f"Cover image {cover_img} not found")
-    except:
-        print(f"Cover image {cover_img} not found")
+            cover_img = None
+        if cover_img is not None:
+            ffmpeg_command += ["-i", cover_img]
+        ffmpeg_command += ["-map", "0:a", "-map_metadata", "1", "-map_chapters", "1"]
+        if cover_img is not None:
+            ffmpeg_command += ["-map", "2:v", "-disposition:v:0", "attached_pic"]
+        ffmpeg_command += ["-codec", "copy", self.outputm4b]
+        result = subprocess.run(ffmpeg_command, input=cover_data)
+        if result.returncode != 0 or not os.path.isfile(self.outputm4b):
+            # The chapters and journal stay, so the mux can be run again without reading the book
+            print(f"ffmpeg failed to build {self.outputm4b}, keeping {files} to retry")
+            if os.path.isfile(self.outputm4b):
+                # A partial m4b would make a --manifest or --watch run skip the book
+                os.remove(self.outputm4b)
+            sys.exit(1)
+        os.remove("FFMETADATAFILE")
+        self.remove_encoded()
+        Journal().remove()
+        for f in files:
+            os.remove(f)
+        return self.outputm4b
+
+def convert_book(args, model_loader=load_model, telemetry=None):
+    """Read the .txt or .epub book `args.sourcefile` to an m4b with the options in `args`, returning its path."""
+    book = open_book(args.sourcefile)
+    if args.sample is not None:
+        sample = args.sample
+    else:
+        sample = "none"
+    cache = None
+    if args.cache_size > 0:
+        cache = SentenceCache(sample, args.exaggeration, args.cfg_weight, args.cache_size * 1024 * 1024)
+    encoder = M4bEncoder(args.sourcefile, sample, args.encode_jobs)
+    journal = Journal()
+    postprocess = {
+        "trim": args.trim_silence,
+        "sentencepause": args.sentence_pause if args.trim_silence else 0,
+        "loudness": args.normalize,
+    }
+    stream = None
+    if args.stream is not None:
+        stream = AudioStream(args.stream, postprocess, telemetry)
+    try:
+        files = read_book(book, sample, args.notitles, args.exaggeration, args.cfg_weight, encoder, cache,
+                          args.workers, model_loader, args.max_tokens, telemetry=telemetry, journal=journal,
+                          postprocess=postprocess, queue_dir=args.distribute, stream=stream,
+                          runaway_ratio=args.runaway_ratio)
+    finally:
+        if stream is not None:
+            stream.close()
+    failed = journal.failed()
+    if failed:
+        encoder.abort()
+        print(f"Sentences failed in {', '.join(failed)}, run again to read those chapters again")
+        sys.exit(1)
+    generate_metadata(files, book.author, book.title, book.chapter_titles, journal, encoder.durations())
+    return encoder.finish(files, args.cover if args.cover is not None else book.cover)
+
+# Options a manifest line or watch directory sidecar can set for its own book
+BOOK_SETTINGS = ("sourcefile", "sample", "cover", "notitles", "exaggeration", "cfg_weight", "max_tokens", "workers",
+                 "cache_size", "trim_silence", "sentence_pause", "normalize", "runaway_ratio")
+
+def book_args(args, entry, base):
+    """
+    Copy of the command line `args` with one book's settings applied. Paths
+    in `entry` are relative to `base`, and all paths are made absolute since
+    every book is read in its own work directory.
+    """
+    unknown = sorted(set(entry) - set(BOOK_SETTINGS))
+    if unknown:
+        raise ValueError(f"Unknown book settings: {', '.join(unknown)}")
+    book = argparse.Namespace(**vars(args))
+    for name in ("sample", "cover", "stream", "distribute"):
+        if getattr(book, name) is not None:
+            setattr(book, name, os.path.abspath(getattr(book, name)))
+    for name, value in entry.items():
+        if name in ("sourcefile", "sample", "cover") and value is not None:
+            value = os.path.abspath(os.path.join(base, value))
+        setattr(book, name, value)
+    return book
+
+def manifest_books(args, manifest):
+    """Yield the books of a manifest, one JSON object per line with a "sourcefile" and any BOOK_SETTINGS."""
+    base = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield book_args(args, json.loads(line), base)
+
+def watch_books(args, directory, interval):
+    """
+    Yield every .txt or .epub book that appears in `directory`, checking
+    every `interval` seconds. Settings for a book are read from a .json file
+    with the same name, and files changed in the last interval are left
+    until they have finished copying.
+    """
+    seen = set()
+    while True:
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            stem, ext = os.path.splitext(path)
+            if ext not in (".txt", ".epub") or not os.path.isfile(path):
+                continue
+            if ext == ".epub" and os.path.isfile(stem + ".txt"):
+                # Already exported, the .txt is the book
+                continue
+            modified = os.path.getmtime(path)
+            if (path, modified) in seen or time.time() - modified < interval:
+                continue
+            seen.add((path, modified))
+            entry = {"sourcefile": name}
+            if os.path.isfile(stem + ".json"):
+                with open(stem + ".json", "r", encoding="utf-8") as file:
+                    entry.update(json.load(file))
+            yield book_args(args, entry, directory)
+        time.sleep(interval)
 
-def main():
-    parser = argparse.ArgumentParser(
-        prog="epub2tts-chatterbox",
-        description="Read a text file to audiobook format",
+def read_books(books, telemetry=None, model_loader=load_model):
+    """
+    Read a stream of books one after another in this process, loading the
+    model only once.
+
+    Every book is read in its own work directory next to it, `{name}.work`,
+    so the partN.flac, journal and metadata scratch files of different
+    books never collide and an interrupted book resumes where it stopped. A
+    book that fails is reported and the batch carries on.
+    """
+    model = None
+    default_conds = None
+    done = 0
+    failed = 0
+    base_loader = model_loader
+    for book in books:
+        try:
+            textfile = book.sourcefile.replace(".epub", ".txt")
+            if book.sourcefile.endswith(".epub") and os.path.isfile(textfile):
+                # An exported .txt may have been edited and is read instead, otherwise the epub is read directly
+                coverfile = book.sourcefile.replace(".epub", ".png")
+                if book.cover is None and os.path.isfile(coverfile):
+                    book.cover = coverfile
+                book.sourcefile = textfile
+            sample = book.sample if book.sample is not None else "none"
+            output = M4bEncoder(book.sourcefile, sample).outputm4b
+            if os.path.isfile(output):
+                print(f"{output} exists, skipping {book.sourcefile}")
+                continue
+            model_loader = base_loader
+            if book.workers <= 1 and book.distribute is None:
+                if model is None:
+                    model = base_loader()
+                    default_conds = model.conds
+                if sample == "none":
+                    # Undo the voice of the previous book
+                    model.conds = default_conds
+                model_loader = lambda: model
+            workdir = os.path.splitext(book.sourcefile)[0] + ".work"
+            os.makedirs(workdir, exist_ok=True)
+            print(f"\n\nReading {book.sourcefile} in {workdir}")
+            if telemetry is not None:
+                telemetry.emit("book", sourcefile=book.sourcefile, workdir=workdir, output=output)
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                convert_book(book, model_loader, telemetry)
+            finally:
+                os.chdir(cwd)
+                try:
+                    # Only empty once the book is done, a failed one keeps its chapters to resume
+                    os.rmdir(workdir)
+                except OSError:
+                    pass
+            done += 1
+        except (Exception, SystemExit) as e:
+            # finish() exits when ffmpeg fails, which should only end this book
+            failed += 1
+            print(f"Failed to read {book.sourcefile}: {e}")
+            if telemetry is not None:
+                telemetry.emit("book_failed", sourcefile=book.sourcefile, error=str(e))
+    print(f"Read {done} book(s), {failed} failed")
+
+def add_encode_option(parser):
+    parser.add_argument(
+        "--encode-jobs",
+        type=int,
+        default=ENCODE_JOBS,
+        help=f"Number of ffmpeg processes encoding finished chapters to AAC at once, 0 to stream the whole book "
+             f"through one (default: {ENCODE_JOBS})",
+    )
+
+def add_model_options(parser):
+    parser.add_argument(
+        "--cpu-fast",
+        action="store_true",
+        help="On the CPU, quantize or compile the model for faster reading, see --cpu-dtype, --compile and --cpu-fast-check",
+    )
+    parser.add_argument(
+        "--cpu-dtype",
+        choices=["int8", "bf16"],
+        default="int8",
+        help="Precision of --cpu-fast: int8 dynamic quantization, or bf16 on CPUs that support it (default: int8)",
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="With --cpu-fast, also run the transformer through torch.compile",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="torch intra-op threads per process (default: torch's choice, or a share of the CPUs with --workers)",
     )
-    parser.add_argument("sourcefile", type=str, help="The epub or text file to process")
+    parser.add_argument(
+        "--interop-threads",
+        type=int,
+        help="torch inter-op threads per process (default: torch's choice)",
+    )
+
+def add_read_options(parser):
     parser.add_argument(
         "--sample",
         type=str,
@@ -544,27 +2715,254 @@ def main():
         default=0.4,
         help="CFG weight for voice cloning (default: 0.4)",
     )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=0,
+        help="Pack adjacent sentences into model inputs of up to this many text tokens and split longer ones "
+             "at clause boundaries, e.g. 150 (default: 0, one sentence per input)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes reading chapters in parallel, each with its own model and share of CPU threads (default: 1)",
+    )
+    parser.add_argument(
+        "--runaway-ratio",
+        type=float,
+        default=2.5,
+        help="Generate a sentence again when its audio is this many times longer than its text warrants, has a long "
+             "silence inside or loops, 0 to keep every output (default: 2.5)",
+    )
+    parser.add_argument(
+        "--trim-silence",
+        action="store_true",
+        help="Trim the silence the model leaves around every sentence and put --sentence-pause between sentences",
+    )
+    parser.add_argument(
+        "--sentence-pause",
+        type=int,
+        default=200,
+        help="Pause between the sentences of a paragraph in ms with --trim-silence (default: 200)",
+    )
+    parser.add_argument(
+        "--normalize",
+        type=float,
+        help="Normalize the speech of every chapter to this RMS loudness in dBFS, e.g. -20 (default: off)",
+    )
+    add_encode_option(parser)
+    add_model_options(parser)
+    parser.add_argument(
+        "--cpu-fast-check",
+        action="store_true",
+        help="Compare --cpu-fast against fp32 on a fixed set of sentences, report latency and quality, then exit",
+    )
+    parser.add_argument(
+        "--stream",
+        type=str,
+        help="Also write the book as a rolling HLS playlist to this directory as it is read, to listen while it is "
+             "being rendered, with chapter starts in chapters.jsonl",
+    )
+    parser.add_argument(
+        "--distribute",
+        type=str,
+        help="Have `worker` processes on any node sharing this directory read the chapters, this process only "
+             "writes and muxes them",
+    )
+    parser.add_argument(
+        "--cache",
+        choices=["list", "prune", "clear"],
+        help="List, prune to --cache-size or clear the voice and sentence caches, then exit",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=4096,
+        help="Size limit of the sentence audio cache in MB, 0 disables it (default: 4096)",
+    )
+    parser.add_argument(
+        "--telemetry",
+        type=str,
+        help="Write progress and timing events as JSON lines to this file or to a tcp://host:port socket",
+    )
+    parser.add_argument(
+        "--profile-every",
+        type=int,
+        default=0,
+        help="Run every Nth generated sentence under the torch profiler, needs --telemetry (default: 0, off)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default="profiles",
+        help="Directory for --profile-every chrome traces (default: profiles)",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help="Read every book listed in this file in one process, one JSON object per line with a \"sourcefile\" "
+             "and optionally its own sample, cover, notitles, exaggeration, cfg_weight, max_tokens, "
+             "workers, cache_size, trim_silence, sentence_pause, normalize or runaway_ratio",
+    )
+    parser.add_argument(
+        "--watch",
+        type=str,
+        help="Read every .txt or .epub book put in this directory, with settings from a .json file of the same name",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=int,
+        default=30,
+        help="Seconds between checks of the --watch directory (default: 30)",
+    )
 
-    args = parser.parse_args()
-    print(args)
+def mux_book(sourcefile, sample="none", cover=None, encode_jobs=ENCODE_JOBS):
+    """
+    Build the m4b from the partN.flac files left by an earlier read, without
+    loading the model. Every chapter of the book has to be there.
+    """
+    import soundfile as sf
+    book = open_book(sourcefile)
+    journal = Journal()
+    files = [f"part{i}.flac" for i in range(1, len(book) + 1)]
+    missing = [f for f in files if not journal.complete(f)]
+    if missing:
+        print(f"Missing or unfinished {', '.join(missing)}, read the book before muxing it")
+        sys.exit(1)
+    encoder = M4bEncoder(sourcefile, sample, encode_jobs)
+    for f in files:
+        audio, sr = sf.read(f, dtype="int16")
+        encoder.add_chapter(audio, sr)
+    generate_metadata(files, book.author, book.title, book.chapter_titles, journal, encoder.durations())
+    return encoder.finish(files, cover if cover is not None else book.cover)
 
+def args_model_loader(args):
+    # A partial of a module-level function, so --workers processes can load the same way
+    cpu_fast = {"dtype": args.cpu_dtype, "compile": args.compile} if args.cpu_fast else None
+    return partial(load_model, cpu_fast=cpu_fast, threads=args.threads, interop_threads=args.interop_threads)
+
+def worker(args):
     ensure_punkt()
+    telemetry = None
+    if args.telemetry:
+        telemetry = Telemetry(args.telemetry)
+    try:
+        run_worker(args.queue_dir, args_model_loader(args), args.cache_size * 1024 * 1024, telemetry, args.idle_exit)
+    finally:
+        if telemetry is not None:
+            telemetry.close()
 
-    #If we get an epub, export that to txt file, then exit
-    if args.sourcefile.endswith(".epub"):
-        book = epub.read_epub(args.sourcefile)
-        export(book, args.sourcefile)
+def synthesize(args, parser):
+    if args.cache:
+        manage_cache(args.cache, args.cache_size * 1024 * 1024)
         exit()
+    if args.cpu_fast_check:
+        cpu_fast = {"dtype": args.cpu_dtype, "compile": args.compile}
+        sample = args.sample if args.sample is not None else "none"
+        passed = check_cpu_fast(cpu_fast, sample, args.exaggeration, args.cfg_weight, args.threads, args.interop_threads)
+        sys.exit(0 if passed else 1)
+    if args.sourcefile is None and args.manifest is None and args.watch is None:
+        parser.error("the following arguments are required: sourcefile")
 
-    book_contents, book_title, book_author, chapter_titles = get_book(args.sourcefile)
-    if args.sample is not None:
-        sample = args.sample
+    ensure_punkt()
+    model_loader = args_model_loader(args)
+
+    telemetry = None
+    if args.telemetry:
+        telemetry = Telemetry(args.telemetry, args.profile_every, args.profile_dir)
+    if args.manifest is not None or args.watch is not None:
+        if args.manifest is not None:
+            books = manifest_books(args, args.manifest)
+        else:
+            books = watch_books(args, args.watch, args.watch_interval)
+        read_books(books, telemetry, model_loader)
     else:
-        sample = "none"
-    files = read_book(book_contents, sample, args.notitles, args.exaggeration, args.cfg_weight)
-    generate_metadata(files, book_author, book_title, chapter_titles)
-    m4bfilename = make_m4b(files, args.sourcefile, sample)
-    add_cover(args.cover, m4bfilename)
-    
+        convert_book(args, model_loader, telemetry)
+    if telemetry is not None:
+        telemetry.close()
+
+# Subcommands, anything else on the command line is the original single-command form
+COMMANDS = ("export", "synthesize", "mux", "worker")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        parser = argparse.ArgumentParser(
+            prog="epub2tts-chatterbox",
+            description="Read a text file to audiobook format",
+        )
+        commands = parser.add_subparsers(dest="command", required=True)
+        export_parser = commands.add_parser("export", help="Export an epub to an editable text file and cover image")
+        export_parser.add_argument("sourcefile", type=str, help="The epub file to export")
+        export_parser.add_argument(
+            "--engine",
+            choices=["lxml", "bs4"],
+            default="lxml",
+            help="Text extraction engine (default: lxml)",
+        )
+        export_parser.add_argument(
+            "--jobs",
+            type=int,
+            help="Number of processes extracting chapters with the lxml engine (default: one per CPU)",
+        )
+        synthesize_parser = commands.add_parser("synthesize", help="Read an epub or text file to an m4b audiobook")
+        synthesize_parser.add_argument("sourcefile", type=str, nargs="?", help="The epub or text file to process")
+        add_read_options(synthesize_parser)
+        mux_parser = commands.add_parser(
+            "mux",
+            help="Build the m4b from the partN.flac files of an earlier read without loading the model",
+        )
+        mux_parser.add_argument("sourcefile", type=str, help="The epub or text file that was read")
+        mux_parser.add_argument("--sample", type=str, help="Sample wav file the book was read with, for the file name")
+        mux_parser.add_argument("--cover", type=str, help="jpg image to use for cover")
+        add_encode_option(mux_parser)
+        worker_parser = commands.add_parser(
+            "worker",
+            help="Read chapters published to a --distribute directory, on this or any other node sharing it",
+        )
+        worker_parser.add_argument("queue_dir", type=str, help="The --distribute directory")
+        add_model_options(worker_parser)
+        worker_parser.add_argument(
+            "--cache-size",
+            type=int,
+            default=4096,
+            help="Size limit of this node's sentence audio cache in MB, 0 disables it (default: 4096)",
+        )
+        worker_parser.add_argument(
+            "--telemetry",
+            type=str,
+            help="Write this worker's progress and timing events as JSON lines to this file or a tcp://host:port socket",
+        )
+        worker_parser.add_argument(
+            "--idle-exit",
+            type=int,
+            default=0,
+            help="Exit after the queue has been empty for this many seconds (default: 0, keep waiting)",
+        )
+    else:
+        parser = argparse.ArgumentParser(
+            prog="epub2tts-chatterbox",
+            description="Read a text file to audiobook format",
+            epilog=f"Commands {', '.join(COMMANDS)} are also available, see epub2tts-chatterbox COMMAND --help",
+        )
+        parser.add_argument("sourcefile", type=str, nargs="?", help="The epub or text file to process")
+        add_read_options(parser)
+
+    args = parser.parse_args(argv)
+    print(args)
+    command = getattr(args, "command", None)
+
+    # An epub is read directly, export it first to edit the text
+    if command == "export":
+        book = epub.read_epub(args.sourcefile)
+        export(book, args.sourcefile, getattr(args, "engine", "lxml"), getattr(args, "jobs", None))
+    elif command == "mux":
+        mux_book(args.sourcefile, args.sample if args.sample is not None else "none", args.cover, args.encode_jobs)
+    elif command == "worker":
+        worker(args)
+    else:
+        synthesize(args, parser)
+
 if __name__ == "__main__":
     main()